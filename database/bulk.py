@@ -0,0 +1,47 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+from pandas.io.sql import get_schema
+
+# Rows converted to Python values at a time; bounds peak memory on wide tables
+BULK_INSERT_CHUNK_ROWS = 20000
+
+
+# Column as a list of values sqlite3 can bind directly
+def _columnValues(series: pd.Series) -> list:
+    # Plain numpy numbers convert in C; NaN binds as NULL
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biuf":
+        return series.tolist()
+
+    if series.dtype.kind == "M":
+        return [None if pd.isna(value) else value.isoformat(sep=" ") for value in series]
+
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+# Loads a DataFrame with executemany over column-wise converted values, one
+# slice of rows at a time, which skips pandas' per-chunk SQL building. A
+# missing or replaced table is created from pandas' DDL for the frame, run on
+# this connection (to_sql would commit). Never commits, so callers can group
+# it with other statements in one transaction or savepoint
+def bulkInsert(connection: sqlite3.Connection, df: pd.DataFrame, tableName: str, ifExists: str = "append"):
+    exists = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tableName,)
+    ).fetchone()
+
+    if ifExists == "replace" or not exists:
+        connection.execute(f'DROP TABLE IF EXISTS "{tableName}"')
+        connection.execute(get_schema(df, tableName, con=connection))
+
+    if df.empty:
+        return
+
+    columns = ", ".join(f'"{column}"' for column in df.columns)
+    placeholders = ", ".join("?" * len(df.columns))
+    insertSql = f'INSERT INTO "{tableName}" ({columns}) VALUES ({placeholders})'
+
+    for start in range(0, len(df), BULK_INSERT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + BULK_INSERT_CHUNK_ROWS]
+        values = [_columnValues(chunk.iloc[:, position]) for position in range(len(chunk.columns))]
+        connection.executemany(insertSql, zip(*values))
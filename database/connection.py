@@ -1,17 +1,38 @@
-import sqlite3
-import pandas as pd
-
 import logging
+from itertools import groupby
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
+
+from database.pool import ConnectionPool, DEFAULT_POOL_SIZE
+from database.pragmas import PRAGMA_PROFILES
+
+# pandas is only imported when a DataFrame is actually requested
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 logger = logging.getLogger(__name__)
 
+RESULT_FORMATS = ("pandas", "tuples")
+
+# Per-connection prepared statement cache; repeated generated SQL skips re-parsing
+STATEMENT_CACHE_SIZE = 1024
+
+
 class DatabaseConnection:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, profile: str = "read_only", poolSize: int = DEFAULT_POOL_SIZE,
+                 minIdle: int = 0):
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown PRAGMA profile: {profile}")
+
         self._totalPlays = None
         self._db_path = db_path
-        self._connection = None
+        self._profile = profile
+        self._poolSize = poolSize
+        self._minIdle = minIdle
+        self._pool = None
         self._isConnected = False
+        self._schemaCache = None
 
     @property
     def isConnected(self):
@@ -28,35 +49,73 @@ class DatabaseConnection:
 
     def connect(self):
         try:
-            self._connection = sqlite3.connect(self._db_path, check_same_thread=False)
-            self._isConnected = True
+            # Connections are reused across requests so SQLite's page cache stays warm
+            self._pool = ConnectionPool(self._db_path, self._poolSize, self._profile,
+                                        cachedStatements=STATEMENT_CACHE_SIZE, minIdle=self._minIdle)
 
-            cursor = self._connection.execute("SELECT COUNT(*) FROM plays")
-            totalPlays = cursor.fetchone()[0]
+            with self._pool.connection() as connection:
+                cursor = connection.execute("SELECT COUNT(*) FROM plays")
+                totalPlays = cursor.fetchone()[0]
             self._totalPlays = totalPlays
 
+            # Only report connected once the database has proven usable
+            self._isConnected = True
+
             logger.info(f"Database connection established: {self._totalPlays} plays loaded")
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             self._isConnected = False
-            self._connection = None
+
+            if self._pool is not None:
+                self._pool.close()
+            self._pool = None
 
 
 
     def disconnect(self):
         if self._isConnected:
-            self._connection.close()
+            self._pool.close()
+            self._pool = None
             self._isConnected = False
+            self._schemaCache = None
         else:
             logger.info("Database has already been disconnected")
 
-    def executeQuery(self, sql: str):
-        if not self._isConnected or self._connection is None:
+    # With chunksize set, returns an iterator of DataFrames of at most
+    # chunksize rows so large results never sit in memory all at once.
+    # resultFormat "tuples" returns (columns, rows) straight from the cursor,
+    # skipping the DataFrame's object columns
+    def executeQuery(self, sql: str, chunksize: Optional[int] = None,
+                     resultFormat: str = "pandas") -> Union["pd.DataFrame", Iterator["pd.DataFrame"], Tuple[List[str], List[tuple]]]:
+        if not self._isConnected or self._pool is None:
             logger.error("Cannot execute query, database connection was not established")
             raise ConnectionError("Database not connected")
 
+        if resultFormat not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result format: {resultFormat}")
+
+        if chunksize and resultFormat != "pandas":
+            raise ValueError("chunksize is only supported for the pandas result format")
+
         try:
-            df = pd.read_sql_query(sql, self._connection)
+            if chunksize:
+                chunks = self._readChunks(sql, chunksize)
+                logger.info(f"Query executed successfully: streaming in chunks of {chunksize} rows")
+                return chunks
+
+            if resultFormat == "tuples":
+                with self._pool.connection() as connection:
+                    cursor = connection.execute(sql)
+                    columns = [col[0] for col in cursor.description]
+                    rows = cursor.fetchall()
+                logger.info(f"Query executed successfully: {len(rows)} rows returned")
+
+                return columns, rows
+
+            import pandas as pd
+
+            with self._pool.connection() as connection:
+                df = pd.read_sql_query(sql, connection)
             logger.info(f"Query executed successfully: {len(df)} rows returned")
             return df
 
@@ -64,25 +123,43 @@ class DatabaseConnection:
             logger.error(f"Query execute failed: {e}")
             raise ValueError(f"Query execute failed: {e}")
 
+    # Holds one pooled connection until the caller has consumed every chunk
+    def _readChunks(self, sql: str, chunksize: int) -> Iterator["pd.DataFrame"]:
+        import pandas as pd
+
+        with self._pool.connection() as connection:
+            yield from pd.read_sql_query(sql, connection, chunksize=chunksize)
+
     def getFullSchema(self) -> str:
         if not self._isConnected:
             return "Not connected to database"
 
-        schemaText = ""
-
-        allTables = "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
-        tables = self.executeQuery(allTables)
-
-        for t in tables['name']:
-            schemaText += f"\n**Table: {t}**\n"
-
-            columns = f"PRAGMA table_info({t})"
-            columns = pd.read_sql_query(columns, self._connection)
-
-            schemaText += f"Columns:\n"
-            for c, col in columns.iterrows():
-                schemaText += f"  - {col['name']} ({col['type']})\n"
-
-        return schemaText
-
+        return "".join(self.getSchemaBlocks().values())
 
+    # Schema text per table, in table-name order, so callers can send a subset
+    def getSchemaBlocks(self) -> Dict[str, str]:
+        if not self._isConnected:
+            return {}
+
+        # Schema is static for the lifetime of a connection
+        if self._schemaCache is not None:
+            return self._schemaCache
+
+        schemaBlocks = {}
+
+        # One query for every table's columns instead of a PRAGMA per table
+        allColumns = """SELECT m.name, p.name, p.type
+                        FROM sqlite_master m JOIN pragma_table_info(m.name) p
+                        WHERE m.type = 'table'
+                        ORDER BY m.name, p.cid"""
+        with self._pool.connection() as connection:
+            rows = connection.execute(allColumns).fetchall()
+
+        for t, columns in groupby(rows, key=itemgetter(0)):
+            # One line per table, "name(col TYPE, ...)", keeps the prompt small;
+            # plays alone has a few hundred columns
+            columnList = ", ".join(f"{col[1]} {col[2]}".rstrip() for col in columns)
+            schemaBlocks[t] = f"{t}({columnList})\n"
+
+        self._schemaCache = schemaBlocks
+        return self._schemaCache
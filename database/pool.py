@@ -0,0 +1,105 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from database.pragmas import applyPragmas
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_CACHED_STATEMENTS = 128
+
+
+# Fixed-size pool of long-lived sqlite3 connections. Connections are opened
+# lazily up to poolSize and handed out LIFO so the most recently used one,
+# with the warmest page cache, is reused first
+class ConnectionPool:
+    def __init__(self, dbPath: str, poolSize: int = DEFAULT_POOL_SIZE, profile: Optional[str] = None,
+                 rowFactory: Optional[Callable] = None, cachedStatements: int = DEFAULT_CACHED_STATEMENTS,
+                 minIdle: int = 0):
+        if poolSize < 1:
+            raise ValueError("poolSize must be at least 1")
+        if not 0 <= minIdle <= poolSize:
+            raise ValueError("minIdle must be between 0 and poolSize")
+
+        self._dbPath = dbPath
+        self._poolSize = poolSize
+        self._profile = profile
+        self._rowFactory = rowFactory
+        self._cachedStatements = cachedStatements
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Open the first connections up front so early requests don't pay for them
+        for _ in range(minIdle):
+            self._idle.put(self._open())
+            self._created += 1
+
+    @property
+    def poolSize(self) -> int:
+        return self._poolSize
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._dbPath, check_same_thread=False, cached_statements=self._cachedStatements)
+        connection.row_factory = self._rowFactory
+
+        if self._profile:
+            applyPragmas(connection, self._profile)
+
+        return connection
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise ConnectionError("Connection pool is closed")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            canOpen = self._created < self._poolSize
+            if canOpen:
+                self._created += 1
+
+        if canOpen:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        # Pool exhausted, wait for a connection to come back
+        return self._idle.get()
+
+    def _release(self, connection: sqlite3.Connection):
+        if self._closed:
+            connection.close()
+            return
+
+        # Never hand out a connection with a half-finished transaction
+        if connection.in_transaction:
+            connection.rollback()
+
+        self._idle.put(connection)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._acquire()
+
+        try:
+            yield connection
+        finally:
+            self._release(connection)
+
+    def close(self):
+        self._closed = True
+
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,54 @@
+import sqlite3
+
+
+# PRAGMA sets applied on connect, keyed by profile name
+PRAGMA_PROFILES = {
+    "high_performance": [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-262144",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA foreign_keys=ON",
+    ],
+}
+# Every pooled reader has its own page cache, so read-only connections keep
+# a small one and lean on a large mmap window that all of them share through
+# the OS cache. journal_mode is left to whoever writes the file
+PRAGMA_PROFILES["read_only"] = [
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16384",
+    "PRAGMA mmap_size=1073741824",
+    "PRAGMA query_only=ON",
+]
+# Pooled readers of the small user database: a few MB of page cache each and
+# no mmap. journal_mode is left to the writer connection, which sets WAL
+PRAGMA_PROFILES["user_read"] = [
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-4096",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA query_only=ON",
+]
+# Initial full load only: no WAL and no fsyncs. A crash mid-load can corrupt
+# the file, which is acceptable because the load starts from scratch anyway.
+# page_size and auto_vacuum only take effect on a new, empty file; larger pages
+# suit the very wide plays rows, and incremental auto_vacuum lets the nightly
+# update reclaim just the pages it freed. The loader is the only user, so it
+# holds the lock throughout
+PRAGMA_PROFILES["bulk_load"] = [
+    "PRAGMA page_size=32768",
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA locking_mode=EXCLUSIVE",
+    "PRAGMA journal_mode=MEMORY",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",
+]
+
+
+# Shared by the API databases and the loader scripts so every connection is tuned the same way
+def applyPragmas(connection: sqlite3.Connection, profile: str = "high_performance"):
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Unknown PRAGMA profile: {profile}")
+
+    connection.executescript(";\n".join(PRAGMA_PROFILES[profile]) + ";")
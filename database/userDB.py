@@ -1,135 +1,321 @@
+import logging
+import queue
 import sqlite3
-from typing import List
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import List, Sequence, Tuple
 
+from database.pool import ConnectionPool
+from database.pragmas import applyPragmas
 from models.savedQuery import SavedQuery
 from models.user import User
 
 
+logger = logging.getLogger(__name__)
+
+
+# Hot statements kept as module constants so sqlite3's per-connection
+# statement cache always sees identical SQL text
+INSERT_USER = """INSERT INTO users (username, email, encPassword)
+                    VALUES (?, ?, ?)
+                    RETURNING id, username, email, encPassword, createdAt, updatedAt"""
+SELECT_USER_BY_ID = """SELECT id, username, email, encPassword, createdAt, updatedAt FROM users WHERE id = ?"""
+SELECT_USER_BY_USERNAME = """SELECT id, username, email, encPassword, createdAt, updatedAt FROM users WHERE username = ?"""
+SELECT_USER_BY_EMAIL = """SELECT id, username, email, encPassword, createdAt, updatedAt FROM users WHERE email = ?"""
+UPDATE_PASSWORD = """UPDATE users
+                    SET encPassword = ?, updatedAt = CURRENT_TIMESTAMP
+                    WHERE id = ?"""
+DELETE_USER = """DELETE FROM users WHERE id = ?"""
+
+INSERT_SAVED_QUERY = """INSERT INTO saved_queries (userID, queryContent, queryName)
+                        VALUES (?, ?, ?)
+                        RETURNING id, userID, queryContent, queryName, createdAt"""
+SELECT_SAVED_QUERY_BY_ID = """SELECT id, userID, queryContent, queryName, createdAt FROM saved_queries WHERE id = ?"""
+SELECT_SAVED_QUERIES_BY_USER = """SELECT id, userID, queryContent, queryName, createdAt FROM saved_queries
+                                    WHERE userID = ? ORDER BY createdAt DESC
+                                    LIMIT ? OFFSET ?"""
+DELETE_SAVED_QUERY = """DELETE FROM saved_queries WHERE id = ?"""
+DELETE_SAVED_QUERIES_BY_USER = """DELETE FROM saved_queries WHERE userID = ?"""
+
+STATEMENT_CACHE_SIZE = 256
+USER_READ_POOL_SIZE = 4
+FETCH_ARRAY_SIZE = 256
+WRITE_BATCH_SIZE = 500
+# Seconds a request waits for its queued write before giving up
+WRITE_TIMEOUT = 30
+SAVED_QUERIES_PAGE_SIZE = 50
+
+# Outcome of the last statement in a queued write
+WriteResult = namedtuple("WriteResult", ["lastrowid", "rowcount", "rows"])
+
+
+def _userFromRow(row: sqlite3.Row) -> User:
+    return User(
+        userID = row["id"],
+        username = row["username"],
+        email = row["email"],
+        encPassword = row["encPassword"],
+        createdAt = row["createdAt"],
+        updatedAt = row["updatedAt"]
+    )
+
+
+def _savedQueryFromRow(row: sqlite3.Row) -> SavedQuery:
+    return SavedQuery(
+        id = row["id"],
+        userID = row["userID"],
+        queryContent = row["queryContent"],
+        queryName = row["queryName"],
+        createdAt = row["createdAt"],
+    )
+
+
 class UserDatabase:
-    def __init__(self, dbPath: str):
+    def __init__(self, dbPath: str, readPoolSize: int = USER_READ_POOL_SIZE, minIdle: int = 0):
         self.dbPath = dbPath
 
+        # Reads share a small query_only pool; all writes go through one writer thread
+        self._readers = ConnectionPool(dbPath, readPoolSize, "user_read", rowFactory = sqlite3.Row,
+                                       cachedStatements = STATEMENT_CACHE_SIZE, minIdle = minIdle)
+        self._writeQueue = queue.Queue()
+
+        # Opened here so a locked or unwritable file fails startup instead of
+        # silently killing the writer thread
+        writer = self._openWriter()
+        self._writerStopped = False
+        self._writerLock = threading.Lock()
+        self._writerThread = threading.Thread(target = self._writerLoop, args = (writer,),
+                                              name = "userdb-writer", daemon = True)
+        self._writerThread.start()
+
+
+    def _openWriter(self) -> sqlite3.Connection:
+        dbConnected = sqlite3.connect(self.dbPath, check_same_thread=False, isolation_level=None,
+                                      cached_statements=STATEMENT_CACHE_SIZE)
+        applyPragmas(dbConnected, "high_performance")
+        dbConnected.row_factory = sqlite3.Row
+
+        return dbConnected
+
+
+    def _write(self, sql: str, params: Sequence = ()) -> WriteResult:
+        return self._writeBatch([(sql, params)])
+
+
+    # Statements in one call are applied atomically. Returns the WriteResult of
+    # the last statement, or raises its error; a write still queued after
+    # WRITE_TIMEOUT seconds is cancelled and raises TimeoutError
+    def _writeBatch(self, statements: List[Tuple[str, Sequence]]) -> WriteResult:
+        future = self._submit(statements)
+
+        try:
+            return future.result(timeout = WRITE_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+
+    def _submit(self, statements: List[Tuple[str, Sequence]]) -> Future:
+        future = Future()
+
+        with self._writerLock:
+            if self._writerStopped:
+                future.set_exception(ConnectionError("User database writer is not running"))
+            else:
+                self._writeQueue.put((statements, future))
+
+        return future
+
+
+    def _writerLoop(self, writer: sqlite3.Connection):
+        batch = []
+
+        try:
+            while True:
+                item = self._writeQueue.get()
+                if item is None:
+                    break
+
+                # Drain whatever else is already waiting into the same transaction
+                batch = [item]
+                stopping = False
+                while len(batch) < WRITE_BATCH_SIZE:
+                    try:
+                        nextItem = self._writeQueue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                    if nextItem is None:
+                        stopping = True
+                        break
+                    batch.append(nextItem)
+
+                self._commitBatch(writer, batch)
+                batch = []
+
+                if stopping:
+                    break
+
+        except Exception as error:
+            logger.exception(f"User database writer stopped: {error}")
+            self._failAll(batch, error)
+
+        finally:
+            # Nothing queued from here on would ever be written
+            with self._writerLock:
+                self._writerStopped = True
+
+            pending = []
+            while True:
+                try:
+                    item = self._writeQueue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    pending.append(item)
+
+            self._failAll(pending, ConnectionError("User database writer is not running"))
+            writer.close()
+
+
+    @staticmethod
+    def _failAll(batch, error: BaseException):
+        for statements, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+
+    def _commitBatch(self, writer: sqlite3.Connection, batch):
+        # Requests that gave up waiting are dropped; the rest can no longer be cancelled
+        batch = [(statements, future) for statements, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        outcomes = []
+
+        try:
+            writer.execute("BEGIN IMMEDIATE")
+
+            for statements, future in batch:
+                # A savepoint per request so one failure doesn't undo the rest
+                writer.execute("SAVEPOINT queued_write")
+                try:
+                    result = None
+                    for sql, params in statements:
+                        cursor = writer.execute(sql, params)
+                        rows = cursor.fetchall()
+                        result = WriteResult(cursor.lastrowid, cursor.rowcount, rows)
+
+                    writer.execute("RELEASE queued_write")
+                    outcomes.append((future, result, None))
+
+                except Exception as error:
+                    writer.execute("ROLLBACK TO queued_write")
+                    writer.execute("RELEASE queued_write")
+                    outcomes.append((future, None, error))
+
+            writer.execute("COMMIT")
+
+        except Exception as error:
+            try:
+                if writer.in_transaction:
+                    writer.execute("ROLLBACK")
+            except sqlite3.Error as rollbackError:
+                logger.error(f"User database rollback failed: {rollbackError}")
+
+            self._failAll(batch, error)
+            return
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+    def close(self):
+        self._writeQueue.put(None)
+        self._writerThread.join()
+
+        self._readers.close()
+
 
     def createTable(self):
-        createStatement = ["""CREATE TABLE IF NOT EXISTS users (
+        createStatement = """CREATE TABLE IF NOT EXISTS users (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             username TEXT UNIQUE NOT NULL,
                             email TEXT UNIQUE NOT NULL,
                             encPassword TEXT NOT NULL,
                             createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                             updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                            );""",
-                            
-                          """CREATE TABLE IF NOT EXISTS saved_queries (
+                            );
+
+                            CREATE TABLE IF NOT EXISTS saved_queries (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             userID INTEGER NOT NULL,
                             queryContent TEXT NOT NULL,
                             queryName TEXT,
                             createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                             FOREIGN KEY (userID) REFERENCES users (id)
-                            );"""
-                       ]
+                            );
 
-        with sqlite3.connect(self.dbPath) as dbConnected:
-            cursor = dbConnected.cursor()
+                            CREATE INDEX IF NOT EXISTS idx_saved_queries_user_created
+                            ON saved_queries (userID, createdAt DESC);"""
 
-            for statement in createStatement:
-                cursor.execute(statement)
-            dbConnected.commit()
+        # Runs once at startup, before any reads or queued writes
+        dbConnected = self._openWriter()
+        try:
+            dbConnected.executescript(createStatement)
+        finally:
+            dbConnected.close()
 
 
     def createUser(self, username: str, email: str, encPassword: str) -> User:
 
-        insertStatement = """INSERT INTO users (username, email, encPassword)
-                                VALUES (?, ?, ?)"""
-
-        with sqlite3.connect(self.dbPath) as dbConnected:
-            cursor = dbConnected.cursor()
-            cursor.execute(insertStatement, (username, email, encPassword))
-            dbConnected.commit()
-
-            newUserID = cursor.lastrowid
+        result = self._write(INSERT_USER, (username, email, encPassword))
 
-            selectStatement = """SELECT * FROM users WHERE id = ?"""
-            cursor.execute(selectStatement, (newUserID,))
+        newUser = _userFromRow(result.rows[0])
 
-            userRow = cursor.fetchone()
-
-            newUser = User (
-                userID = userRow[0],
-                username = userRow[1],
-                email = userRow[2],
-                encPassword = userRow[3],
-                createdAt = userRow[4],
-                updatedAt = userRow[5]
-            )
-
-            return newUser
+        return newUser
 
 
     def getUserByID(self, userID: int) -> User | None:
 
-        userStatement = """SELECT * FROM users WHERE id = ?"""
-
-        with sqlite3.connect(self.dbPath) as dbConnected:
+        with self._readers.connection() as dbConnected:
             cursor = dbConnected.cursor()
-            cursor.execute(userStatement, (userID,))
+            cursor.execute(SELECT_USER_BY_ID, (userID,))
             userRow = cursor.fetchone()
 
             if userRow is None:
                 return None
 
-            getUser = User (
-                userID = userRow[0],
-                username = userRow[1],
-                email = userRow[2],
-                encPassword = userRow[3],
-                createdAt = userRow[4],
-                updatedAt = userRow[5]
-            )
+            getUser = _userFromRow(userRow)
             return getUser
 
 
     def getUserByUsername(self, username: str) -> User | None:
-        userStatement = """SELECT * FROM users WHERE username = ?"""
-
-        with sqlite3.connect(self.dbPath) as dbConnected:
+        with self._readers.connection() as dbConnected:
             cursor = dbConnected.cursor()
-            cursor.execute(userStatement, (username,))
+            cursor.execute(SELECT_USER_BY_USERNAME, (username,))
             userRow = cursor.fetchone()
 
             if userRow is None:
                 return None
 
-            return User(
-                userID=userRow[0],
-                username=userRow[1],
-                email=userRow[2],
-                encPassword=userRow[3],
-                createdAt=userRow[4],
-                updatedAt=userRow[5]
-            )
+            return _userFromRow(userRow)
 
 
     def getUserByEmail(self, email: str) -> User | None:
-        emailStatement = """SELECT * FROM users WHERE email = ?"""
-
-        with sqlite3.connect(self.dbPath) as dbConnected:
+        with self._readers.connection() as dbConnected:
             cursor = dbConnected.cursor()
-            cursor.execute(emailStatement, (email,))
+            cursor.execute(SELECT_USER_BY_EMAIL, (email,))
             userRow = cursor.fetchone()
 
             if userRow is None:
                 return None
 
-            getUser = User (
-                userID = userRow[0],
-                username = userRow[1],
-                email = userRow[2],
-                encPassword = userRow[3],
-                createdAt = userRow[4],
-                updatedAt = userRow[5]
-            )
+            getUser = _userFromRow(userRow)
             return getUser
 
 
@@ -154,128 +340,77 @@ class UserDatabase:
         updateStatement = f"""UPDATE users SET {', '.join(updateFields)} WHERE id = ?"""
 
         try:
-            with sqlite3.connect(self.dbPath) as dbConnected:
-                cursor = dbConnected.cursor()
-                cursor.execute(updateStatement, params)
-                dbConnected.commit()
+            self._write(updateStatement, params)
 
-                return self.getUserByID(userID)
+            return self.getUserByID(userID)
 
         except sqlite3.IntegrityError as error:
-            print("Update failed - username or email already exists:", error)
+            logger.exception(f"Update failed - username or email already exists: {error}")
             raise
         except sqlite3.Error as error:
-            print("Could not update user:", error)
+            logger.exception(f"Could not update user: {error}")
             raise
 
 
     def deleteUser(self, userID: int) -> bool:
-        deleteQueryStatement = """DELETE FROM saved_queries WHERE userID = ?"""
-        deleteUserStatement = """DELETE FROM users WHERE id = ?"""
-
         try:
-            with sqlite3.connect(self.dbPath) as dbConnected:
-                cursor = dbConnected.cursor()
+            # Both deletes are applied atomically in the writer's transaction
+            self._writeBatch([
+                (DELETE_SAVED_QUERIES_BY_USER, (userID,)),
+                (DELETE_USER, (userID,))
+            ])
 
-                cursor.execute(deleteQueryStatement, (userID,))
-                cursor.execute(deleteUserStatement, (userID,))
-
-                dbConnected.commit()
-                return True
+            return True
 
         except sqlite3.Error as error:
-            print("Could not delete user", error)
+            logger.exception(f"Could not delete user: {error}")
             return False
 
 
     def updatePassword(self, userID: int, newEncPassword: str) -> bool:
-        updateStatement = """UPDATE users 
-                            SET encPassword = ?, updatedAt = CURRENT_TIMESTAMP 
-                            WHERE id = ?"""
-
         try:
-            with sqlite3.connect(self.dbPath) as dbConnected:
-                cursor = dbConnected.cursor()
-                cursor.execute(updateStatement, (newEncPassword, userID))
-                dbConnected.commit()
+            result = self._write(UPDATE_PASSWORD, (newEncPassword, userID))
 
+            if result.rowcount == 0:
+                return False
 
-                if cursor.rowcount == 0:
-                    return False
-
-                return True
+            return True
 
         except sqlite3.Error as error:
-            print("Could not update password:", error)
+            logger.exception(f"Could not update password: {error}")
             return False
 
 
     def createSavedQuery(self, userID: int, queryContent: str, queryName: str) -> SavedQuery:
-        saveQuery = """INSERT INTO saved_queries (userID, queryContent, queryName)
-                        VALUES (?, ?, ?)"""
-
-        with sqlite3.connect(self.dbPath) as dbConnected:
-            cursor = dbConnected.cursor()
-            cursor.execute(saveQuery, (userID, queryContent, queryName))
-            dbConnected.commit()
-
-            newQueryID = cursor.lastrowid
-
-            selectStatement = """SELECT * FROM saved_queries WHERE id = ?"""
-            cursor.execute(selectStatement, (newQueryID,))
-            queryRow = cursor.fetchone()
-
-            newSavedQuery = SavedQuery(
-                id = queryRow[0],
-                userID = queryRow[1],
-                queryContent = queryRow[2],
-                queryName = queryRow[3],
-                createdAt = queryRow[4],
-            )
+        result = self._write(INSERT_SAVED_QUERY, (userID, queryContent, queryName))
 
-            return newSavedQuery
+        newSavedQuery = _savedQueryFromRow(result.rows[0])
 
+        return newSavedQuery
 
-    def getAllSavedQueries(self, userID: int) -> List[SavedQuery]:
-        getStatement = """SELECT * FROM saved_queries WHERE userID = ?
-                            ORDER BY createdAt DESC"""
 
-        with sqlite3.connect(self.dbPath) as dbConnected:
+    # One page, newest first, read in index order so no sort is needed
+    def getAllSavedQueries(self, userID: int, limit: int = SAVED_QUERIES_PAGE_SIZE, offset: int = 0) -> List[SavedQuery]:
+        with self._readers.connection() as dbConnected:
             cursor = dbConnected.cursor()
-            getSavedQueries = cursor.execute(getStatement, (userID,)).fetchall()
+            cursor.arraysize = FETCH_ARRAY_SIZE
 
-            allSavedQueries = []
-
-            for row in getSavedQueries:
-                query = SavedQuery(
-                    id = row[0],
-                    userID = row[1],
-                    queryContent = row[2],
-                    queryName = row[3],
-                    createdAt = row[4],
-                )
-                allSavedQueries.append(query)
+            # Iterate the cursor directly instead of materializing fetchall()
+            cursor.execute(SELECT_SAVED_QUERIES_BY_USER, (userID, limit, offset))
+            allSavedQueries = [_savedQueryFromRow(row) for row in cursor]
 
             return allSavedQueries
 
 
     def getQueryByID(self, queryID: int) -> SavedQuery | None:
-        getStatement = """SELECT * FROM saved_queries WHERE id = ?"""
-
-        with sqlite3.connect(self.dbPath) as dbConnected:
+        with self._readers.connection() as dbConnected:
             cursor = dbConnected.cursor()
-            queryRow = cursor.execute(getStatement, (queryID,)).fetchone()
+            queryRow = cursor.execute(SELECT_SAVED_QUERY_BY_ID, (queryID,)).fetchone()
 
             if queryRow is None:
                 return None
 
-            return SavedQuery(
-                id = queryRow[0],
-                userID = queryRow[1],
-                queryContent = queryRow[2],
-                queryName = queryRow[3],
-                createdAt = queryRow[4],
-            )
+            return _savedQueryFromRow(queryRow)
 
 
     def updateSavedQuery(self, queryID: int, queryContent: str = None, queryName: str = None) -> SavedQuery:
@@ -297,26 +432,15 @@ class UserDatabase:
         params.append(queryID)
         updateStatement = f"""UPDATE saved_queries SET {', '.join(updateFields)} WHERE id = ?"""
 
-        with sqlite3.connect(self.dbPath) as dbConnected:
-            cursor = dbConnected.cursor()
-            cursor.execute(updateStatement, params)
-            dbConnected.commit()
+        self._write(updateStatement, params)
 
-            return self.getQueryByID(queryID)
+        return self.getQueryByID(queryID)
 
 
     def deleteSavedQuery(self, queryID: int) -> bool:
-        deleteStatement = """DELETE FROM saved_queries WHERE id = ?"""
-
         try:
-            with sqlite3.connect(self.dbPath) as dbConnected:
-                cursor = dbConnected.cursor()
-                cursor.execute(deleteStatement, (queryID,))
-                dbConnected.commit()
-                return True
+            self._write(DELETE_SAVED_QUERY, (queryID,))
+            return True
         except sqlite3.Error as error:
-            print("Could not delete saved query", error)
+            logger.exception(f"Could not delete saved query: {error}")
             return False
-
-
-
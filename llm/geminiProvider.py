@@ -1,90 +1,195 @@
+import asyncio
+import datetime
+import io
 import os
+import time
 from dotenv import load_dotenv
-from typing import Any
+from typing import Any, Dict, FrozenSet, Optional, Tuple
 
 import google.generativeai as genAI
 
-from llm.provider import LLMProvider
+from llm.prompts import SYSTEM_PROMPT_TEMPLATE
+from llm.provider import LLMProvider, sqlBlockComplete
+from llm.responseCache import ResponseCache
 
 load_dotenv()
 
+# Server-side context cache lifetime for the system prompt; entries are
+# rebuilt lazily a little before they expire
+CONTEXT_CACHE_TTL = 3600
+CONTEXT_CACHE_REFRESH_MARGIN = 120
+
+# Rarely needed tables, only sent to the model when the question mentions them
+_OPTIONAL_TABLE_KEYWORDS = {
+    "combine_results": ("combine", "40 yard", "40-yard", "forty", "bench press", "vertical", "broad jump",
+                        "shuttle", "3 cone", "three cone"),
+    "draft_picks": ("draft", "rookie", "overall pick"),
+    "draft_values": ("draft value", "pick value", "trade value", "trade chart"),
+    "ftn_charting": ("ftn", "charting", "play action", "play-action", "motion", "blitz", "screen", "rpo"),
+}
+
 class GeminiProvider(LLMProvider):
-    def __init__(self, modelName: str = 'gemini-2.5-pro'):
+    def __init__(self, modelName: str = 'gemini-2.5-pro', responseCache: Optional[ResponseCache] = None):
         self._databaseSchema = None
+        self._schemaBlocks = None
+        self._modelCache = {}
+        self._modelLocks = {}
+        self._retiredContents = []
+        self._inFlight = {}
         self._modelName = modelName
+        self._responseCache = responseCache
         self._apiKey = os.getenv('GEMINI_API_KEY')
 
         if not self._apiKey:
             raise Exception('GEMINI_API_KEY not set')
 
-    def generateSQL(self, query: str) -> str:
-        return self._callGeminiAPI(query)
-
-    def _callGeminiAPI(self, query: str) -> Any | None:
-        systemPrompt = f"""You are an expert NFL data analyst assistant and SQLite3 engineer. Convert natural language queries about NFL play-by-play data into executable SQLite queries.
-
-                        `**Database Schema:**
-                        {self._databaseSchema}
-
-
-                        **CRITICAL RULES:**
-                        1. **Current Season Detection**: If query mentions "2025" or "this season" or "current season", you MUST use the plays table
-                        2. **Exact Column Names**: ONLY use column names that exist in the schema above
-                        3. **Table Names**: Use `plays` (NOT play_by_play), `weekly_stats` (NOT weekly_data)
-                        4. **Defensive Stats**: Most defensive stats are in the `plays` table, not `weekly_stats`
-                        5. **Player Names**: Use `player_name` in weekly_stats, but specific `*_player_name` columns in plays
-                        6. **Season Type**: Use 'REG' for regular season, 'POST' for playoffs
-                        
-                        ---
-                        **Instructions for Complex Queries:**
-                        
-                        1.  **Event-Based Questions ("Last time X happened"):** For questions asking when an event last occurred (e.g., "last time a player had X stats in a game"), you must first aggregate the statistics by game (`game_id`) and then apply the condition.
-                            * **Step 1:** Use a `GROUP BY` on the `game_id`.
-                            * **Step 2:** Use a `HAVING` clause to filter for the specific condition (e.g., `HAVING COUNT(*) = 3`).
-                            * **Step 3:** `ORDER BY` the game date or season/week in descending order (`DESC`).
-                            * **Step 4:** Use `LIMIT 1` to get the most recent occurrence.
-                        
-                        2.  **Player Names:** Always perform a case-insensitive search for player names, e.g., `WHERE players.full_name LIKE 'Jared Goff'`.
-                            **IMPORTANT**: When selecting player names, ALWAYS include the full first and last name by joining with player_ids table:
-                            EXAMPLE: ```sql
-                                 SELECT p.name as player_name, ...
-                                 FROM plays
-                                 LEFT JOIN player_ids p ON plays.passer_player_id = p.gsis_id
-                            ```
-                        3.  **Clarity:** Prioritize returning key information like the season, week, game date, and opponent to give the user a complete answer.
-                        
-                        ---
-
-                        **Guidelines:**
-                        * Return only the executable SQL query wrapped in ```sql ``` blocks
-                        * Acronym list (not a full list):
-                            ~~OFFENSE~~
-                            * QB - Quarterback/Passer
-                            * RB - Running Back/rusher
-                            * WR - Wide Receiver/receiver/pass catcher
-                            * TE - Tight End/pass catcher
-                            * FB - Fullback
-                            ~~DEFENSE~~
-                            * EDGE/OLB/DE - Edge Rusher/Outside linebacker/Defensive End
-                            * LB - Linebacker
-                            * DT - Defensive Tackle
-                            * S - Safety
-                            * CB - Cornerback
-                            * MLB - Middle Linebacker
-                        * When you see the words "current" or a number formatted as a year (ex: 2025), always treat it as the desired season
-                        * Always use LIMIT for large result sets (default 10 unless specified)
-                        * For defensive comparisons, aggregate from the `plays` table using the defensive columns above
-                        * Use LIKE '%LastName%' for player name matching (e.g., LIKE '%Garrett%' for Myles Garrett)
-                        * For drops, use incomplete_pass = 1 and check desc field for 'drop' mentions"""
-
-        prompt = f"{systemPrompt}\n\nUser query: {query}\nResponse:"
+        genAI.configure(api_key=self._apiKey)
+
+    @property
+    def databaseSchema(self) -> Optional[str]:
+        return self._databaseSchema
+
+    @databaseSchema.setter
+    def databaseSchema(self, schema: Optional[str]):
+        self._databaseSchema = schema
+        self._schemaBlocks = None
+        # Server-side caches built for the old schema are deleted on the next rebuild
+        self._retiredContents.extend(entry[2] for entry in self._modelCache.values() if entry[2] is not None)
+        self._modelCache = {}
+
+    @property
+    def schemaBlocks(self) -> Optional[Dict[str, str]]:
+        return self._schemaBlocks
+
+    # Per-table schema lets each prompt leave out optional tables the query doesn't need
+    @schemaBlocks.setter
+    def schemaBlocks(self, blocks: Optional[Dict[str, str]]):
+        self.databaseSchema = "".join(blocks.values()) if blocks else None
+        self._schemaBlocks = blocks
+
+    async def generateSQL(self, query: str) -> str:
+        cacheKey = ResponseCache.makeKey(self._modelName, self._databaseSchema, query)
+
+        if self._responseCache is not None:
+            cached = await self._responseCache.getAsync(cacheKey)
+            if cached is not None:
+                return cached
+
+        # Identical questions already in flight share one Gemini call
+        pending = self._inFlight.get(cacheKey)
+        if pending is None:
+            pending = asyncio.ensure_future(self._generateAndCache(query, cacheKey))
+            self._inFlight[cacheKey] = pending
+            pending.add_done_callback(lambda _: self._inFlight.pop(cacheKey, None))
+
+        # Shielded so one cancelled request doesn't cancel the call for the others
+        return await asyncio.shield(pending)
+
+    async def _generateAndCache(self, query: str, cacheKey: str) -> Any | None:
+        response = await self._callGeminiAPI(query)
+
+        if response and self._responseCache is not None:
+            await self._responseCache.setAsync(cacheKey, response)
+
+        return response
+
+    async def forgetResponse(self, query: str):
+        if self._responseCache is not None:
+            await self._responseCache.discardAsync(ResponseCache.makeKey(self._modelName, self._databaseSchema, query))
+
+    def _buildSystemPrompt(self, optionalTables: Optional[FrozenSet[str]] = None) -> str:
+        if optionalTables is None:
+            return SYSTEM_PROMPT_TEMPLATE.format(schema=self._databaseSchema)
+
+        schema = "".join(block for table, block in self._schemaBlocks.items()
+                         if table not in _OPTIONAL_TABLE_KEYWORDS or table in optionalTables)
+        return SYSTEM_PROMPT_TEMPLATE.format(schema=schema)
+
+    # Uploads the prompt as cached content so Gemini skips re-reading it on every
+    # call. Prompts below the context-cache minimum size (or models without
+    # caching) fall back to a plain system_instruction that never expires
+    def _buildModel(self, systemPrompt: str) -> Tuple[genAI.GenerativeModel, float, Any]:
+        try:
+            cachedContent = genAI.caching.CachedContent.create(
+                model=f"models/{self._modelName}",
+                system_instruction=systemPrompt,
+                ttl=datetime.timedelta(seconds=CONTEXT_CACHE_TTL)
+            )
+            expiresAt = time.monotonic() + CONTEXT_CACHE_TTL - CONTEXT_CACHE_REFRESH_MARGIN
+
+            return genAI.GenerativeModel.from_cached_content(cachedContent), expiresAt, cachedContent
+        except Exception as e:
+            print(f"Gemini context caching unavailable, sending the prompt inline. Error {e}")
+            return genAI.GenerativeModel(self._modelName, system_instruction=systemPrompt), float("inf"), None
+
+    # Cached content is billed until it expires, so replaced entries are deleted right away
+    def _deleteCachedContents(self, cachedContents):
+        for cachedContent in cachedContents:
+            try:
+                cachedContent.delete()
+            except Exception as e:
+                print(f"Could not delete Gemini cached content. Error {e}")
+
+    def _optionalTablesFor(self, query: str) -> FrozenSet[str]:
+        queryLower = query.lower()
+
+        return frozenset(table for table, keywords in _OPTIONAL_TABLE_KEYWORDS.items()
+                         if table in self._schemaBlocks and any(k in queryLower for k in keywords))
+
+    async def _modelFor(self, query: str) -> genAI.GenerativeModel:
+        optionalTables = self._optionalTablesFor(query) if self._schemaBlocks else None
+
+        # Only a handful of table combinations occur, so each model is built once
+        # and only rebuilt when its cached content is about to expire
+        entry = self._modelCache.get(optionalTables)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        # One rebuild per combination; concurrent callers wait for it and reuse it
+        lock = self._modelLocks.setdefault(optionalTables, asyncio.Lock())
+        async with lock:
+            entry = self._modelCache.get(optionalTables)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+
+            newEntry = await asyncio.to_thread(self._buildModel, self._buildSystemPrompt(optionalTables))
+            self._modelCache[optionalTables] = newEntry
+
+            stale, self._retiredContents = self._retiredContents, []
+            if entry is not None and entry[2] is not None:
+                stale.append(entry[2])
+            if stale:
+                await asyncio.to_thread(self._deleteCachedContents, stale)
+
+        return newEntry[0]
+
+    # Deletes every server-side cache this provider created; call on shutdown
+    async def aclose(self):
+        contents = self._retiredContents + [entry[2] for entry in self._modelCache.values() if entry[2] is not None]
+        self._retiredContents = []
+        self._modelCache = {}
+
+        if contents:
+            await asyncio.to_thread(self._deleteCachedContents, contents)
+
+    async def _callGeminiAPI(self, query: str) -> Any | None:
+        prompt = f"User query: {query}\nResponse:"
 
         try:
-            genAI.configure(api_key=self._apiKey)
-            model = genAI.GenerativeModel(self._modelName)
+            # Stream the answer and stop reading once the ```sql block has closed
+            model = await self._modelFor(query)
+            response = await model.generate_content_async(prompt, stream=True)
+            received = io.StringIO()
+
+            async for chunk in response:
+                if not chunk.parts:
+                    continue
+                received.write(chunk.text)
+
+                if sqlBlockComplete(received.getvalue()):
+                    break
 
-            response = model.generate_content(prompt)
-            return response.text.strip()
+            return received.getvalue().strip()
         except Exception as e:
             print(f"There was an error retrieving a response from Gemini. Error {e}")
             return None
@@ -1,8 +1,142 @@
-from llm.provider import LLMProvider
+import asyncio
+import io
+import logging
+import os
+from typing import Optional
+
+import httpx
+import orjson
+
+from llm.prompts import SYSTEM_PROMPT_TEMPLATE
+from llm.provider import LLMProvider, sqlBlockComplete
+from llm.responseCache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'gpt-oss:20b')
+REQUEST_TIMEOUT = 500
+
+# Keeps the model resident between questions so an idle gap doesn't cost a
+# multi-second reload. Every request sends the same options, since a
+# different context size would also force a reload
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '24h')
+OLLAMA_NUM_CTX = int(os.getenv('OLLAMA_NUM_CTX', '8192'))
+MODEL_OPTIONS = {"num_ctx": OLLAMA_NUM_CTX, "temperature": 0}
 
 class OllamaProvider(LLMProvider):
-    def generateSQL(self, query: str) -> str:
-        pass
+    def __init__(self, modelName: str = OLLAMA_MODEL, baseUrl: str = OLLAMA_URL,
+                 httpClient: Optional[httpx.AsyncClient] = None, responseCache: Optional[ResponseCache] = None):
+        self._databaseSchema = None
+        self._modelName = modelName
+        self._responseCache = responseCache
+        self._inFlight = {}
+        self._generateUrl = f"{baseUrl.rstrip('/')}/api/generate"
+        self._systemPrompt = self._buildSystemPrompt()
+
+        # One keep-alive client for every call instead of a connection per request
+        self._ownsClient = httpClient is None
+        self._client = httpClient or httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=16)
+        )
+
+    @property
+    def databaseSchema(self) -> Optional[str]:
+        return self._databaseSchema
+
+    @databaseSchema.setter
+    def databaseSchema(self, schema: Optional[str]):
+        self._databaseSchema = schema
+        self._systemPrompt = self._buildSystemPrompt()
+
+    def _buildSystemPrompt(self) -> str:
+        return SYSTEM_PROMPT_TEMPLATE.format(schema=self._databaseSchema)
+
+    async def generateSQL(self, query: str) -> str | None:
+        cacheKey = ResponseCache.makeKey(self._modelName, self._databaseSchema, query)
+
+        # A local model takes seconds per answer; repeat questions skip it
+        if self._responseCache is not None:
+            cached = await self._responseCache.getAsync(cacheKey)
+            if cached is not None:
+                return cached
+
+        # Identical questions already in flight share one model call
+        pending = self._inFlight.get(cacheKey)
+        if pending is None:
+            pending = asyncio.ensure_future(self._generateAndCache(query, cacheKey))
+            self._inFlight[cacheKey] = pending
+            pending.add_done_callback(lambda _: self._inFlight.pop(cacheKey, None))
+
+        # Shielded so one cancelled request doesn't cancel the call for the others
+        return await asyncio.shield(pending)
+
+    async def _generateAndCache(self, query: str, cacheKey: str) -> str | None:
+        response = await self._streamResponse(query)
+
+        if response and self._responseCache is not None:
+            await self._responseCache.setAsync(cacheKey, response)
+
+        return response
+
+    async def forgetResponse(self, query: str):
+        if self._responseCache is not None:
+            await self._responseCache.discardAsync(ResponseCache.makeKey(self._modelName, self._databaseSchema, query))
+
+    async def _streamResponse(self, query: str) -> str | None:
+        payload = {
+            "model": self._modelName,
+            "system": self._systemPrompt,
+            "prompt": f"User query: {query}\nResponse:",
+            "stream": True,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": MODEL_OPTIONS
+        }
+
+        try:
+            received = io.StringIO()
+
+            # Ollama streams one JSON object per line; leaving the block early
+            # closes the stream once the ```sql block is complete
+            async with self._client.stream("POST", self._generateUrl, json=payload) as response:
+                response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+
+                    chunk = orjson.loads(line)
+                    received.write(chunk.get('response', ''))
+
+                    if chunk.get('done') or sqlBlockComplete(received.getvalue()):
+                        break
+
+            return received.getvalue().strip()
+        except Exception as e:
+            logger.error(f"There was an error retrieving a response from Ollama. Error {e}")
+            return None
+
+    # Loads the model before the first question arrives; an empty prompt
+    # only loads it, without generating anything
+    async def warmUp(self):
+        payload = {
+            "model": self._modelName,
+            "prompt": "",
+            "stream": False,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": MODEL_OPTIONS
+        }
+
+        try:
+            response = await self._client.post(self._generateUrl, json=payload)
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Could not preload the Ollama model. Error {e}")
+
+    async def aclose(self):
+        if self._ownsClient:
+            await self._client.aclose()
 
     def getProviderName(self) -> str:
-        return "Ollama GPT-OSS"
\ No newline at end of file
+        return "Ollama GPT-OSS"
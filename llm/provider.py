@@ -2,20 +2,28 @@ from abc import ABC, abstractmethod
 
 class LLMProvider(ABC):
     @abstractmethod
-    def generateSQL(self, query: str) -> str:
+    async def generateSQL(self, query: str) -> str:
         pass
 
     @abstractmethod
     def getProviderName(self) -> str:
         pass
 
+    # Called when a response led to no usable result, so a cached copy of it
+    # is not served again. Providers without a cache have nothing to do
+    async def forgetResponse(self, query: str):
+        pass
 
 
-
+# True once a streamed response holds a closed ```sql block, so providers can
+# stop reading the commentary that usually follows it
+def sqlBlockComplete(text: str) -> bool:
+    fenceStart = text.find("```sql")
+    return fenceStart != -1 and text.find("```", fenceStart + 6) != -1
 
 
 # Separate function to utilize any LLM service
-def anyProvider(provider: LLMProvider, query: str):
-    sql = provider.generateSQL(query)
+async def anyProvider(provider: LLMProvider, query: str):
+    sql = await provider.generateSQL(query)
     print(f"Using {provider.getProviderName()}")
     return sql
\ No newline at end of file
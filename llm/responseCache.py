@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from llm.prompts import SYSTEM_PROMPT_TEMPLATE
+
+logger = logging.getLogger(__name__)
+
+# Conservative canonicalization: case, whitespace and articles are folded,
+# plus plural forms of the same stat abbreviation. Anything that could change
+# the meaning (synonyms, prepositions, question words, punctuation) is kept,
+# because a wrong hit returns the wrong SQL silently and persists
+_PLURAL_ABBREVIATIONS = {
+    "qbs": "qb", "rbs": "rb", "wrs": "wr", "tes": "te", "tds": "td", "ints": "int",
+}
+_ARTICLES = frozenset(["the", "a", "an"])
+
+
+def canonicalQuestion(query: str) -> str:
+    words = query.lower().split()
+
+    return " ".join(_PLURAL_ABBREVIATIONS.get(word, word) for word in words if word not in _ARTICLES)
+
+
+# Persisted rows are pruned on open: keys from an older schema, prompt or
+# model can never be hit again, so rows only live this long, and the table
+# keeps at most the newest PERSISTED_MAX_ROWS
+PERSISTED_MAX_AGE_DAYS = 30
+PERSISTED_MAX_ROWS = 50000
+
+
+# Part of every key, so editing the prompt retires SQL generated under the old one
+_PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:16]
+
+
+# LRU cache of LLM responses, optionally persisted to a SQLite key/value
+# table so repeat questions survive restarts. The table should live in its
+# own file so it never waits on another database's writer. Code on the event
+# loop uses the *Async methods, which keep SQLite work off the loop
+class ResponseCache:
+    def __init__(self, dbPath: Optional[str] = None, maxSize: int = 1024):
+        self._maxSize = maxSize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+
+        if dbPath:
+            self._connection = sqlite3.connect(dbPath, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS nl_query_cache (
+                                        key TEXT PRIMARY KEY,
+                                        sql TEXT NOT NULL,
+                                        createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                                        )""")
+            self._prune()
+
+
+    def _prune(self):
+        try:
+            self._connection.execute("DELETE FROM nl_query_cache WHERE createdAt < datetime('now', ?)",
+                                     (f"-{PERSISTED_MAX_AGE_DAYS} days",))
+            self._connection.execute("""DELETE FROM nl_query_cache WHERE key NOT IN (
+                                        SELECT key FROM nl_query_cache ORDER BY createdAt DESC LIMIT ?
+                                        )""", (PERSISTED_MAX_ROWS,))
+        except sqlite3.Error as error:
+            logger.warning(f"Could not prune cached LLM responses: {error}")
+
+
+    @staticmethod
+    def makeKey(modelName: str, schema: Optional[str], query: str) -> str:
+        schemaHash = hashlib.sha256((schema or "").encode("utf-8")).hexdigest()
+        normalized = canonicalQuestion(query)
+
+        return hashlib.sha256(
+            f"{modelName}\0{_PROMPT_VERSION}\0{schemaHash}\0{normalized}".encode("utf-8")
+        ).hexdigest()
+
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+            if self._connection is None:
+                return None
+
+            row = self._connection.execute("SELECT sql FROM nl_query_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            self._remember(key, row[0])
+            return row[0]
+
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._remember(key, value)
+
+            if self._connection is not None:
+                try:
+                    self._connection.execute("INSERT OR REPLACE INTO nl_query_cache (key, sql) VALUES (?, ?)",
+                                             (key, value))
+                except sqlite3.Error as error:
+                    logger.warning(f"Could not persist cached LLM response: {error}")
+
+
+    def discard(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+            if self._connection is not None:
+                try:
+                    self._connection.execute("DELETE FROM nl_query_cache WHERE key = ?", (key,))
+                except sqlite3.Error as error:
+                    logger.warning(f"Could not remove cached LLM response: {error}")
+
+
+    async def getAsync(self, key: str) -> Optional[str]:
+        # Memory hits answer inline; only a miss goes to SQLite in a worker thread
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if self._connection is None:
+            return None
+
+        return await asyncio.to_thread(self.get, key)
+
+
+    async def setAsync(self, key: str, value: str):
+        if self._connection is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+
+    async def discardAsync(self, key: str):
+        if self._connection is None:
+            self.discard(key)
+        else:
+            await asyncio.to_thread(self.discard, key)
+
+
+    def _remember(self, key: str, value: str):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._maxSize:
+            self._entries.popitem(last=False)
+
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -3,22 +3,31 @@
 FastAPI Backend for NFL Natural Language Query System
 Refactored with OOP architecture
 """
+import asyncio
 import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
-from fastapi import FastAPI, HTTPException, Depends
+import httpx
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+import orjson
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 import logging
 from contextlib import asynccontextmanager
 from database.userDB import UserDatabase
 from models.user import User
-from utils.authDependencies import setUserDatabase, getCurrentUser
+from utils.authDependencies import setUserDatabase, getCurrentUser, forgetCachedUser
 from utils.jwt import createAccessToken
 from services.queryProcessor import QueryProcessor
 from llm.geminiProvider import GeminiProvider
-from utils.password import hashPassword, verifyPassword
+from llm.ollamaProvider import OllamaProvider
+from llm.provider import LLMProvider
+from llm.responseCache import ResponseCache
+from utils.password import hashPasswordAsync, needsRehash, verifyPasswordCached
 
 # GLOBAL VARIABLES
 
@@ -31,19 +40,59 @@ userDb: Optional[UserDatabase] = None
 DATA_DIR = os.getenv('DATA_DIR', '/app/data')
 NFL_DB = os.path.join(DATA_DIR, 'nfl_complete_database.db')
 USER_DB = os.path.join(DATA_DIR, 'user_database.db')
+RESPONSE_CACHE_DB = os.path.join(DATA_DIR, 'response_cache.db')
+
+# Connection pool sizing; roughly one connection per concurrently running request
+NFL_DB_POOL_SIZE = int(os.getenv('NFL_DB_POOL_SIZE', '10'))
+USER_DB_POOL_SIZE = int(os.getenv('USER_DB_POOL_SIZE', '10'))
+DB_POOL_MIN_IDLE = int(os.getenv('DB_POOL_MIN_IDLE', '2'))
+
+# Worker threads for blocking SQLite calls made from async endpoints
+DB_THREADS = int(os.getenv('DB_THREADS', '32'))
+
+# Serve the local Ollama model alongside Gemini; needs a reachable OLLAMA_URL
+OLLAMA_ENABLED = os.getenv('OLLAMA_ENABLED') == '1'
+
+# Saved query page size limits for GET /queries
+MAX_SAVED_QUERIES_PAGE = 500
+
+# Server processes when run directly (start.sh uses the same default). Caches,
+# the user database writer thread and Gemini's billed context caches are all
+# per process, so extra workers contend on user writes and pay for duplicate
+# context caches
+WEB_WORKERS = int(os.getenv('WEB_CONCURRENCY', '1'))
+DEV_MODE = os.getenv('DEV') == '1'
+
+# Browser origins allowed to call the API directly (comma separated). The
+# bundled frontend goes through the nginx /api proxy and is same-origin
+CORS_ORIGINS = [origin.strip() for origin in os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',') if origin.strip()]
+CORS_MAX_AGE = 86400
+
+# Responses at least this large are gzipped; level 4 keeps CPU cost low
+GZIP_MINIMUM_SIZE = 1024
+GZIP_LEVEL = 4
+
+# Upper bound on sub-requests in one /batch call
+MAX_BATCH_REQUESTS = 20
+
+# Read-only page-load calls a batch may contain, matched exactly against the
+# raw path, so encoded or dotted variants of other routes never get through
+BATCH_ALLOWED_PATHS = frozenset(["/", "/health", "/status", "/models", "/examples", "/auth/profile", "/queries"])
 
 # Pydantic Models (API Layer)
 
 class QueryRequest(BaseModel):
     question: str = Field(..., description = "What do you want to know?")
     include_sql: bool = Field(default = False, description = "Include generated SQL in response")
-    model: str = Field(default = "gemini", description = "LLM model to use (currently only 'gemini')")
+    model: str = Field(default = "gemini", description = "LLM model to use ('gemini', or 'ollama' when enabled)")
 
 
 # Query response endpoint class
 class QueryResponse(BaseModel):
     success: bool
-    data: Optional[List[Dict[str, Any]]] = None
+    # Rows come straight from SQLite as value arrays in `columns` order;
+    # typed Any so they are never re-validated
+    data: Any = None
     columns: Optional[List[str]] = None
     sqlQuery: Optional[str] = None
     error: Optional[str] = None
@@ -109,6 +158,17 @@ class SavedQueriesListResponse(BaseModel):
     success: bool
     queries: List[Dict[str, Any]] = Field(default_factory = list)
     count: int = 0
+    hasMore: bool = False
+
+
+# BATCH REQUEST CLASSES
+class BatchItem(BaseModel):
+    method: str = Field(default = "GET", description = "HTTP method (only GET is supported)")
+    path: str = Field(..., description = "API path, e.g. /auth/profile or /queries?limit=20")
+
+
+class BatchRequest(BaseModel):
+    requests: Dict[str, BatchItem] = Field(..., description = "Sub-requests keyed by a client-chosen name")
 
 
 # ====================================================================
@@ -118,32 +178,58 @@ class SavedQueriesListResponse(BaseModel):
 
 queryProcessor: Optional[QueryProcessor] = None
 geminiProvider: Optional[GeminiProvider] = None
+ollamaProvider: Optional[OllamaProvider] = None
+responseCache: Optional[ResponseCache] = None
+
+# QueryRequest.model id -> provider, filled in at startup
+llmProviders: Dict[str, LLMProvider] = {}
+_ollamaWarmUp: Optional[asyncio.Task] = None
+
+# Runs a blocking database call in the default executor so the event loop stays free
+async def _db(fn, *args, **kwargs):
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
 
-    global queryProcessor, geminiProvider, userDb
+    global queryProcessor, geminiProvider, ollamaProvider, userDb, responseCache, _ollamaWarmUp
 
     logger.info("Initializing Ask me NFL...")
 
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers = DB_THREADS))
+
     try:
-        geminiProvider = GeminiProvider(modelName = 'gemini-2.5-pro')
+        responseCache = ResponseCache(RESPONSE_CACHE_DB)
+        geminiProvider = GeminiProvider(modelName = 'gemini-2.5-pro', responseCache = responseCache)
+        llmProviders["gemini"] = geminiProvider
         logger.info(f"✓ Gemini Provider initialized")
 
+        if OLLAMA_ENABLED:
+            ollamaProvider = OllamaProvider(responseCache = responseCache)
+            llmProviders["ollama"] = ollamaProvider
+            logger.info(f"✓ Ollama Provider initialized")
+
         queryProcessor = QueryProcessor(
             db_path = NFL_DB,
-            llm_provider = geminiProvider
+            llm_provider = geminiProvider,
+            poolSize = NFL_DB_POOL_SIZE,
+            minIdle = DB_POOL_MIN_IDLE
         )
 
-        userDb = UserDatabase(USER_DB)
+        userDb = UserDatabase(USER_DB, readPoolSize = USER_DB_POOL_SIZE, minIdle = DB_POOL_MIN_IDLE)
         userDb.createTable()
         setUserDatabase(userDb)
         logger.info('User database initialized')
 
         queryProcessor.connect()
 
-        schema = queryProcessor.getFullSchema()
-        geminiProvider._databaseSchema = schema
+        geminiProvider.schemaBlocks = queryProcessor.getSchemaBlocks()
+
+        if ollamaProvider:
+            ollamaProvider.databaseSchema = geminiProvider.databaseSchema
+            # Loading the model can take a while, so startup doesn't wait for it
+            _ollamaWarmUp = asyncio.create_task(ollamaProvider.warmUp())
 
         logger.info(f"✓ Database connected: {queryProcessor.isConnected}")
         total_plays = queryProcessor.totalPlays if queryProcessor.totalPlays else 0
@@ -157,8 +243,30 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("Shutting down Ask Me NFL...")
+    if geminiProvider:
+        await geminiProvider.aclose()
+    if _ollamaWarmUp:
+        _ollamaWarmUp.cancel()
+    if ollamaProvider:
+        await ollamaProvider.aclose()
+    llmProviders.clear()
     if queryProcessor:
         queryProcessor.disconnect()
+    if userDb:
+        userDb.close()
+    if responseCache:
+        responseCache.close()
+
+
+# Gzip that leaves the NDJSON stream alone: compressing it would buffer
+# events until the whole result is ready
+class _GZipExceptStreams(GZipMiddleware):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/query/stream":
+            await self.app(scope, receive, send)
+            return
+
+        await super().__call__(scope, receive, send)
 
 
 # ==========
@@ -169,45 +277,74 @@ app = FastAPI(
     title="🏈 Ask me NFL",
     description="Natural language interface for granular NFL statistics",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS connector to React front
+# CORS connector to React front. Auth is a bearer header, not cookies, so no
+# credentials; preflights are cached by the browser for CORS_MAX_AGE
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ORIGINS,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=CORS_MAX_AGE,
 )
 
+app.add_middleware(_GZipExceptStreams, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_LEVEL)
+
 
 # =============
 # API Endpoints
 # =============
 
+# Static payloads are encoded once at import instead of on every request
+def _staticJson(payload: Dict[str, Any]) -> Response:
+    return Response(content = orjson.dumps(payload), media_type = "application/json")
+
+
+_ROOT_RESPONSE = _staticJson({
+    "message": "🏈 Ask me NFL v2.0",
+    "architecture": "Object-Oriented Design",
+    "version": "2.0.0",
+    "endpoints": {
+        "/query": "POST - Execute request queries",
+        "/query/stream": "POST - Execute request queries, streaming NDJSON events",
+        "/status": "GET - Check database status",
+        "/models": "GET - Get available LLM models",
+        "/health": "GET - Health check",
+        "/examples": "GET - Get example queries",
+        "/batch": "POST - Run several API calls in one round trip"
+    }
+})
+
+_EXAMPLES_RESPONSE = _staticJson({
+    "examples": [
+        "Top 5 QBs by passing yards per attempt in 2025",
+        "Jared Goff vs. Patrick Mahomes major QB statistics",
+        "When was the last time Jared Goff threw 3 interceptions in a single game?",
+        "2024 QB leaders in redzone interceptions",
+        "Compare Sam Darnold and Baker Mayfield all passing stats 2025",
+        "What's the highest single game sack count for a defender, all-time?",
+        "Which teams have turned the ball over the most on third down?",
+        "Show me TJ Watt's total sacks vs. divisional opponents all-time"
+    ]
+})
+
+_HEALTH_RESPONSES = {
+    connected: _staticJson({"status": "healthy", "databaseConnected": connected})
+    for connected in (True, False)
+}
+
+
 @app.get("/", summary="Root endpoint")
 async def root():
-    return {
-        "message": "🏈 Ask me NFL v2.0",
-        "architecture": "Object-Oriented Design",
-        "version": "2.0.0",
-        "endpoints": {
-            "/query": "POST - Execute request queries",
-            "/status": "GET - Check database status",
-            "/models": "GET - Get available LLM models",
-            "/health": "GET - Health check",
-            "/examples": "GET - Get example queries"
-        }
-    }
+    return _ROOT_RESPONSE
 
 
 @app.get("/health", summary="Health check")
 async def health_check():
-    return {
-        "status": "healthy",
-        "databaseConnected": queryProcessor.isConnected if queryProcessor else False
-    }
+    return _HEALTH_RESPONSES[bool(queryProcessor and queryProcessor.isConnected)]
 
 
 @app.get("/status", response_model=DatabaseStatus, summary="Database status")
@@ -240,25 +377,44 @@ async def get_available_models():
             "description": "Google Gemini AI"
         })
 
+    if ollamaProvider:
+        models.append({
+            "id": "ollama",
+            "name": ollamaProvider.getProviderName(),
+            "model": ollamaProvider._modelName,
+            "available": True,
+            "description": "Local model served by Ollama"
+        })
+
     return {"models": models}
 
 
+# Provider for a QueryRequest.model id; 400 for models this server doesn't run
+def _providerFor(model: str) -> LLMProvider:
+    llmProvider = llmProviders.get(model)
+
+    if llmProvider is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown model: {model}. Available: {', '.join(sorted(llmProviders))}."
+        )
+
+    return llmProvider
+
+
 @app.post("/query", response_model = QueryResponse, summary = "Execute query")
 async def execute_query(request: QueryRequest):
 
     if not queryProcessor:
         raise HTTPException(status_code=503, detail="Service not initialized")
 
-    if request.model != "gemini":
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unknown model: {request.model}. Currently only 'gemini' is supported."
-        )
+    llmProvider = _providerFor(request.model)
 
 
-    result = queryProcessor.processInput(
+    result = await queryProcessor.processInput(
         query=request.question,
-        includeSQL=request.include_sql
+        includeSQL=request.include_sql,
+        llmProvider=llmProvider
     )
 
 
@@ -271,31 +427,80 @@ async def execute_query(request: QueryRequest):
         )
 
 
-    return QueryResponse(
-        success=True,
-        data=result['data'],
-        columns=result['columns'],
-        rowsReturned=result['rowsReturned'],
-        sqlQuery=result.get('sqlQuery'),
-        timing=result['responseTime']
-    )
+    # Bypasses the response model so thousands of rows go straight to orjson
+    return ORJSONResponse({
+        "success": True,
+        "data": result['data'],
+        "columns": result['columns'],
+        "sqlQuery": result.get('sqlQuery'),
+        "error": None,
+        "timing": result['responseTime'],
+        "rowsReturned": result['rowsReturned']
+    })
+
+
+# Newline-delimited JSON events (sql, columns, rows..., done | error) so the
+# client can show progress before the full result is ready
+@app.post("/query/stream", summary = "Execute query, streaming results")
+async def stream_query(request: QueryRequest):
+
+    if not queryProcessor:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+
+    llmProvider = _providerFor(request.model)
+
+    async def events():
+        async for event in queryProcessor.streamInput(query=request.question, includeSQL=request.include_sql,
+                                                     llmProvider=llmProvider):
+            yield orjson.dumps(event) + b"\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
 
 @app.get("/examples", summary = "Example queries")
 async def get_examples():
+    return _EXAMPLES_RESPONSE
+
+
+# Runs several API calls in one round trip, e.g. profile + saved queries +
+# status on page load. Sub-requests are dispatched in-process through the app
+# concurrently and carry the caller's Authorization header
+@app.post("/batch", summary = "Run several requests at once")
+async def batch(request: BatchRequest, httpRequest: Request):
+    if len(request.requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(status_code = 400, detail = f"At most {MAX_BATCH_REQUESTS} requests per batch")
+
+    for item in request.requests.values():
+        if item.method.upper() != "GET":
+            raise HTTPException(status_code = 400, detail = f"Only GET is allowed in a batch: {item.method}")
+
+        path, _, _ = item.path.partition("?")
+        if path not in BATCH_ALLOWED_PATHS:
+            raise HTTPException(status_code = 400, detail = f"Path not allowed in a batch: {item.path}")
+
+    # Sub-responses are decoded here and the combined response is gzipped
+    # once, so the inner calls must not be compressed as well
+    headers = {"Accept-Encoding": "identity"}
+    if "authorization" in httpRequest.headers:
+        headers["Authorization"] = httpRequest.headers["authorization"]
+
+    async with httpx.AsyncClient(transport = httpx.ASGITransport(app = app), base_url = "http://batch") as client:
+        responses = await asyncio.gather(*(
+            client.get(item.path, headers = headers)
+            for item in request.requests.values()
+        ))
+
+    results = {}
+    for name, response in zip(request.requests, responses):
+        try:
+            body = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            body = response.text
+
+        results[name] = {"status": response.status_code, "body": body}
+
+    return {"responses": results}
 
-    return {
-        "examples": [
-            "Top 5 QBs by passing yards per attempt in 2025",
-            "Jared Goff vs. Patrick Mahomes major QB statistics",
-            "When was the last time Jared Goff threw 3 interceptions in a single game?",
-            "2024 QB leaders in redzone interceptions",
-            "Compare Sam Darnold and Baker Mayfield all passing stats 2025",
-            "What's the highest single game sack count for a defender, all-time?",
-            "Which teams have turned the ball over the most on third down?",
-            "Show me TJ Watt's total sacks vs. divisional opponents all-time"
-        ]
-    }
 
 # =====================================
 
@@ -306,15 +511,15 @@ async def register_user(request: RegisterRequest):
     if not userDb:
         raise HTTPException(status_code = 503, detail="Service not initialized")
 
-    if userDb.getUserByUsername(request.username):
+    if await _db(userDb.getUserByUsername, request.username):
         return AuthResponse(success = False, message = "Username already registered")
-    if userDb.getUserByEmail(request.email):
+    if await _db(userDb.getUserByEmail, request.email):
         return AuthResponse(success = False, message = "Email already registered")
 
-    encPassword = hashPassword(request.password)
+    encPassword = await hashPasswordAsync(request.password)
 
     try:
-        newUser = userDb.createUser(request.username, request.email, encPassword)
+        newUser = await _db(userDb.createUser, request.username, request.email, encPassword)
         token = createAccessToken({"sub": newUser.username})
 
         return AuthResponse(success = True, message = "User registered successfully",
@@ -332,13 +537,21 @@ async def login_user(request: LoginRequest):
     if not userDb:
         raise HTTPException(status_code = 503, detail="Service not initialized")
 
-    user = userDb.getUserByUsername(request.username)
+    user = await _db(userDb.getUserByUsername, request.username)
     if user is None:
         return AuthResponse(success = False, message = "Invalid credentials")
 
-    if not verifyPassword(request.password, user.encPassword):
+    if not await verifyPasswordCached(request.password, user.encPassword):
         return AuthResponse(success = False, message = "Invalid credentials")
 
+    # Upgrade bcrypt hashes, or argon2 ones with outdated parameters, while the plaintext is at hand
+    if needsRehash(user.encPassword):
+        try:
+            await _db(userDb.updatePassword, user.id, await hashPasswordAsync(request.password))
+            forgetCachedUser(user.username)
+        except Exception as e:
+            logger.warning(f"Password rehash failed: {e}")
+
     token = createAccessToken({"sub": user.username})
     return AuthResponse(success = True, message = "Login successful", token = token, user = user.toDict())
 
@@ -357,11 +570,13 @@ async def update_profile(request: UpdateProfileRequest, currentUser: User = Depe
         return MessageResponse(success = False, message = "No user to update")
 
     try:
-        userDb.updateUser(
+        await _db(
+            userDb.updateUser,
             currentUser.id,
             username = request.username,
             email = request.email
         )
+        forgetCachedUser(currentUser.username)
 
         return MessageResponse(success = True, message = "User profile updated successfully")
 
@@ -377,16 +592,18 @@ async def change_password(request: ChangePasswordRequest, currentUser: User = De
     if not userDb:
         raise HTTPException(status_code = 503, detail="Service not initialized")
 
-    if not verifyPassword(request.currentPassword, currentUser.encPassword):
+    if not await verifyPasswordCached(request.currentPassword, currentUser.encPassword):
         return MessageResponse(success = False, message = "Current password is incorrect")
 
-    encPassword = hashPassword(request.newPassword)
+    encPassword = await hashPasswordAsync(request.newPassword)
 
     try:
-        userDb.updatePassword(
+        await _db(
+            userDb.updatePassword,
             currentUser.id,
             encPassword
         )
+        forgetCachedUser(currentUser.username)
 
         return MessageResponse(success = True, message = "Password changed successfully")
 
@@ -400,7 +617,8 @@ async def delete_account(currentUser: User = Depends(getCurrentUser)):
     if not userDb:
         raise HTTPException(status_code = 503, detail = "Service not initialized")
 
-    isDeleted = userDb.deleteUser(currentUser.id)
+    isDeleted = await _db(userDb.deleteUser, currentUser.id)
+    forgetCachedUser(currentUser.username)
     if not isDeleted:
         return MessageResponse(success = False, message = "Account could not be deleted")
 
@@ -420,7 +638,8 @@ async def save_query(request: SaveQueryRequest, currentUser: User = Depends(getC
         else:
             queryName = "Untitled query"
 
-        savedQuery = userDb.createSavedQuery(
+        savedQuery = await _db(
+            userDb.createSavedQuery,
             userID = currentUser.id,
             queryContent = request.queryText,
             queryName = queryName
@@ -441,19 +660,28 @@ async def save_query(request: SaveQueryRequest, currentUser: User = Depends(getC
 
 
 @app.get("/queries", response_model = SavedQueriesListResponse, summary = "Get all saved queries")
-async def get_saved_queries(currentUser: User = Depends(getCurrentUser)):
+async def get_saved_queries(
+        limit: int = Query(50, ge = 1, le = MAX_SAVED_QUERIES_PAGE, description = "Page size"),
+        offset: int = Query(0, ge = 0, description = "Queries to skip"),
+        currentUser: User = Depends(getCurrentUser)
+):
     if not userDb:
         raise HTTPException(status_code=503, detail="Service not initialized")
 
     try:
-        queries = userDb.getAllSavedQueries(currentUser.id)
-        queriesList = [q.toDict() for q in queries]
-
-        return SavedQueriesListResponse(
-            success = True,
-            queries = queriesList,
-            count = len(queriesList)
-        )
+        # One extra row tells the client whether another page exists
+        queries = await _db(userDb.getAllSavedQueries, currentUser.id, limit + 1, offset)
+        hasMore = len(queries) > limit
+        queriesList = [q.toDict() for q in queries[:limit]]
+
+        # Serialized straight to orjson; the rows are already plain dicts, so
+        # validating every one against the response model is wasted work
+        return ORJSONResponse({
+            "success": True,
+            "queries": queriesList,
+            "count": len(queriesList),
+            "hasMore": hasMore
+        })
 
     except Exception as e:
         logger.error(f"Failed to get saved queries: {e}")
@@ -474,7 +702,7 @@ async def update_saved_query(
     if not userDb:
         raise HTTPException(status_code = 503, detail = "Service not initialized")
 
-    query = userDb.getQueryByID(queryId)
+    query = await _db(userDb.getQueryByID, queryId)
 
     if query is None:
         return SavedQueryResponse(
@@ -489,7 +717,8 @@ async def update_saved_query(
         )
 
     try:
-        updatedQuery = userDb.updateSavedQuery(
+        updatedQuery = await _db(
+            userDb.updateSavedQuery,
             queryID = queryId,
             queryContent = request.queryText,
             queryName = request.queryName
@@ -518,7 +747,7 @@ async def delete_saved_query(
     if not userDb:
         raise HTTPException(status_code = 503, detail = "Service not initialized")
 
-    query = userDb.getQueryByID(queryId)
+    query = await _db(userDb.getQueryByID, queryId)
 
     if query is None:
         return MessageResponse(
@@ -533,7 +762,7 @@ async def delete_saved_query(
         )
 
     try:
-        success = userDb.deleteSavedQuery(queryId)
+        success = await _db(userDb.deleteSavedQuery, queryId)
 
         if not success:
             return MessageResponse(
@@ -558,10 +787,15 @@ if __name__ == "__main__":
     import uvicorn
     logger.info("Starting Ask me NFL...")
 
+    # Auto-reload only in development; otherwise one process per core on uvloop/httptools
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        reload=DEV_MODE,
+        workers=None if DEV_MODE else WEB_WORKERS,
+        loop="uvloop",
+        http="httptools",
+        log_level="info",
+        access_log=DEV_MODE
     )
\ No newline at end of file
@@ -1,17 +1,24 @@
 class SavedQuery:
+    __slots__ = ('id', 'userID', 'queryContent', 'queryName', 'createdAt', '_dict')
+
     def __init__(self, id, userID, queryContent, queryName, createdAt):
         self.id = id
         self.userID = userID
         self.queryContent = queryContent
         self.queryName = queryName
         self.createdAt = createdAt
+        self._dict = None
 
 
+    # Built once; saved queries are not modified after they are read
     def toDict(self):
-        return {
-            'id': self.id,
-            'userID': self.userID,
-            'queryContent': self.queryContent,
-            'queryName': self.queryName,
-            'createdAt': self.createdAt,
-        }
\ No newline at end of file
+        if self._dict is None:
+            self._dict = {
+                'id': self.id,
+                'userID': self.userID,
+                'queryContent': self.queryContent,
+                'queryName': self.queryName,
+                'createdAt': self.createdAt,
+            }
+
+        return self._dict
@@ -1,4 +1,6 @@
 class User:
+    __slots__ = ('id', 'username', 'email', 'encPassword', 'createdAt', 'updatedAt', '_dict')
+
     def __init__(self, userID, username, email, encPassword, createdAt, updatedAt):
         self.id = userID
         self.username = username
@@ -6,14 +8,17 @@ class User:
         self.encPassword = encPassword
         self.createdAt = createdAt
         self.updatedAt = updatedAt
+        self._dict = None
 
+    # Built once; users are not modified after they are read
     def toDict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'createdAt': self.createdAt,
-            'updatedAt': self.updatedAt,
-        }
-
+        if self._dict is None:
+            self._dict = {
+                'id': self.id,
+                'username': self.username,
+                'email': self.email,
+                'createdAt': self.createdAt,
+                'updatedAt': self.updatedAt,
+            }
 
+        return self._dict
@@ -9,9 +9,14 @@ import sqlite3
 import pandas as pd
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import os
-from typing import List, Optional
+from typing import Callable, List, Optional
+
+from database.bulk import bulkInsert
+from database.pragmas import applyPragmas
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,13 +28,71 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Page cache while building indexes, in KiB
+INDEX_BUILD_CACHE_KIB = 524288
+
+# Dataset groups fetched at the same time; the downloads are network-bound
+DOWNLOAD_WORKERS = 5
+
+# Per-season datasets are fetched a few seasons at a time, several batches at once
+SEASON_BATCH_SIZE = 5
+SEASON_FETCH_WORKERS = 4
+
 
 class NFLDataDownloader:
     def __init__(self, db_path: str = "nfl_complete.db"):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Shared by the download threads; every write holds _write_lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._write_lock = threading.RLock()
+        applyPragmas(self.conn, "bulk_load")
         self.download_stats = {}
 
+    def write_table(self, df: pd.DataFrame, table_name: str, if_exists: str = 'replace'):
+        """Insert a DataFrame with one executemany in a single transaction"""
+        with self._write_lock:
+            bulkInsert(self.conn, df, table_name, if_exists)
+            self.conn.commit()
+
+    def write_seasons(self, df: pd.DataFrame, table_name: str):
+        """Replace only the seasons present in df, leaving the rest of an existing table untouched"""
+        with self._write_lock:
+            exists = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+            ).fetchone()
+
+            if not exists:
+                self.write_table(df, table_name)
+                return
+
+            # Batches arrive in any order, so the table grows to the union of their
+            # columns; columns a batch lacks are left NULL for its rows
+            existing = {row[1] for row in self.conn.execute(f'PRAGMA table_info("{table_name}")')}
+            for column in df.columns:
+                if column not in existing:
+                    self.conn.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{column}"')
+
+            seasons = [int(season) for season in df['season'].unique()]
+            placeholders = ", ".join("?" * len(seasons))
+            self.conn.execute(f"DELETE FROM {table_name} WHERE season IN ({placeholders})", seasons)
+            self.write_table(df, table_name, if_exists='append')
+
+    def load_seasons(self, fetch: Callable[[List[int]], pd.DataFrame], years: List[int], table_name: str):
+        """Fetch years in batches on a thread pool and write each batch as soon as it arrives;
+        a batch that fails is logged and skipped so the others still load"""
+        batches = [years[i:i + SEASON_BATCH_SIZE] for i in range(0, len(years), SEASON_BATCH_SIZE)]
+
+        with ThreadPoolExecutor(max_workers=SEASON_FETCH_WORKERS) as pool:
+            futures = {pool.submit(fetch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    self.write_seasons(future.result(), table_name)
+                except Exception as e:
+                    with self._write_lock:
+                        self.conn.rollback()
+                    logger.error(f"{table_name} seasons {min(batch)}-{max(batch)} failed: {e}")
+
     def log_progress(self, dataset_name: str, years: List[int], start_time: float):
         """Log download progress and statistics"""
         elapsed = time.time() - start_time
@@ -50,8 +113,7 @@ class NFLDataDownloader:
         logger.info("Downloading play-by-play data...")
         start_time = time.time()
         try:
-            pbp_data = nfl.import_pbp_data(years, downcast=True)
-            pbp_data.to_sql('plays', self.conn, if_exists='replace', index=False)
+            self.load_seasons(lambda batch: nfl.import_pbp_data(batch, downcast=True), years, 'plays')
             self.log_progress('play_by_play', years, start_time)
         except Exception as e:
             logger.error(f"Play-by-play download failed: {e}")
@@ -59,8 +121,7 @@ class NFLDataDownloader:
         logger.info("Downloading weekly player stats...")
         start_time = time.time()
         try:
-            weekly_data = nfl.import_weekly_data(years, downcast=True)
-            weekly_data.to_sql('weekly_stats', self.conn, if_exists='replace', index=False)
+            self.load_seasons(lambda batch: nfl.import_weekly_data(batch, downcast=True), years, 'weekly_stats')
             self.log_progress('weekly_stats', years, start_time)
         except Exception as e:
             logger.error(f"Weekly data download failed: {e}")
@@ -68,8 +129,7 @@ class NFLDataDownloader:
         logger.info("Downloading seasonal stats...")
         start_time = time.time()
         try:
-            seasonal_data = nfl.import_seasonal_data(years)
-            seasonal_data.to_sql('seasonal_stats', self.conn, if_exists='replace', index=False)
+            self.load_seasons(nfl.import_seasonal_data, years, 'seasonal_stats')
             self.log_progress('seasonal_stats', years, start_time)
         except Exception as e:
             logger.error(f"Seasonal data download failed: {e}")
@@ -85,7 +145,7 @@ class NFLDataDownloader:
         start_time = time.time()
         try:
             seasonal_rosters = nfl.import_seasonal_rosters(years)
-            seasonal_rosters.to_sql('seasonal_rosters', self.conn, if_exists='replace', index=False)
+            self.write_table(seasonal_rosters, 'seasonal_rosters')
             self.log_progress('seasonal_rosters', years, start_time)
         except Exception as e:
             logger.error(f"Seasonal rosters download failed: {e}")
@@ -94,7 +154,7 @@ class NFLDataDownloader:
         start_time = time.time()
         try:
             weekly_rosters = nfl.import_weekly_rosters(years)
-            weekly_rosters.to_sql('weekly_rosters', self.conn, if_exists='replace', index=False)
+            self.write_table(weekly_rosters, 'weekly_rosters')
             self.log_progress('weekly_rosters', years, start_time)
         except Exception as e:
             logger.error(f"Weekly rosters download failed: {e}")
@@ -110,7 +170,7 @@ class NFLDataDownloader:
         start_time = time.time()
         try:
             ngs_passing = nfl.import_ngs_data('passing', years)
-            ngs_passing.to_sql('ngs_passing', self.conn, if_exists='replace', index=False)
+            self.write_table(ngs_passing, 'ngs_passing')
             self.log_progress('ngs_passing', years, start_time)
         except Exception as e:
             logger.error(f"NGS passing download failed: {e}")
@@ -119,7 +179,7 @@ class NFLDataDownloader:
         start_time = time.time()
         try:
             ngs_rushing = nfl.import_ngs_data('rushing', years)
-            ngs_rushing.to_sql('ngs_rushing', self.conn, if_exists='replace', index=False)
+            self.write_table(ngs_rushing, 'ngs_rushing')
             self.log_progress('ngs_rushing', years, start_time)
         except Exception as e:
             logger.error(f"NGS rushing download failed: {e}")
@@ -128,7 +188,7 @@ class NFLDataDownloader:
         start_time = time.time()
         try:
             ngs_receiving = nfl.import_ngs_data('receiving', years)
-            ngs_receiving.to_sql('ngs_receiving', self.conn, if_exists='replace', index=False)
+            self.write_table(ngs_receiving, 'ngs_receiving')
             self.log_progress('ngs_receiving', years, start_time)
         except Exception as e:
             logger.error(f"NGS receiving download failed: {e}")
@@ -139,7 +199,7 @@ class NFLDataDownloader:
             start_time = time.time()
             try:
                 ftn_data = nfl.import_ftn_data(ftn_years, downcast=True)
-                ftn_data.to_sql('ftn_charting', self.conn, if_exists='replace', index=False)
+                self.write_table(ftn_data, 'ftn_charting')
                 self.log_progress('ftn_charting', ftn_years, start_time)
             except Exception as e:
                 logger.error(f"FTN data download failed: {e}")
@@ -156,7 +216,7 @@ class NFLDataDownloader:
         start_time = time.time()
         try:
             schedules = nfl.import_schedules(years)
-            schedules.to_sql('schedules', self.conn, if_exists='replace', index=False)
+            self.write_table(schedules, 'schedules')
             self.log_progress('schedules', years, start_time)
         except Exception as e:
             logger.error(f"Schedules download failed: {e}")
@@ -166,7 +226,7 @@ class NFLDataDownloader:
         start_time = time.time()
         try:
             draft_picks = nfl.import_draft_picks(years)
-            draft_picks.to_sql('draft_picks', self.conn, if_exists='replace', index=False)
+            self.write_table(draft_picks, 'draft_picks')
             self.log_progress('draft_picks', years, start_time)
         except Exception as e:
             logger.error(f"Draft picks download failed: {e}")
@@ -177,7 +237,7 @@ class NFLDataDownloader:
             start_time = time.time()
             try:
                 combine_data = nfl.import_combine_data(combine_years)
-                combine_data.to_sql('combine_results', self.conn, if_exists='replace', index=False)
+                self.write_table(combine_data, 'combine_results')
                 self.log_progress('combine_results', combine_years, start_time)
             except Exception as e:
                 logger.error(f"Combine data download failed: {e}")
@@ -190,7 +250,7 @@ class NFLDataDownloader:
         start_time = time.time()
         try:
             player_ids = nfl.import_ids()
-            player_ids.to_sql('player_ids', self.conn, if_exists='replace', index=False)
+            self.write_table(player_ids, 'player_ids')
             self.log_progress('player_ids', ['all'], start_time)
         except Exception as e:
             logger.error(f"Player IDs download failed: {e}")
@@ -199,7 +259,7 @@ class NFLDataDownloader:
         start_time = time.time()
         try:
             team_desc = nfl.import_team_desc()
-            team_desc.to_sql('teams', self.conn, if_exists='replace', index=False)
+            self.write_table(team_desc, 'teams')
             self.log_progress('teams', ['all'], start_time)
         except Exception as e:
             logger.error(f"Team data download failed: {e}")
@@ -208,7 +268,7 @@ class NFLDataDownloader:
         start_time = time.time()
         try:
             draft_values = nfl.import_draft_values()
-            draft_values.to_sql('draft_values', self.conn, if_exists='replace', index=False)
+            self.write_table(draft_values, 'draft_values')
             self.log_progress('draft_values', ['all'], start_time)
         except Exception as e:
             logger.error(f"Draft values download failed: {e}")
@@ -217,17 +277,35 @@ class NFLDataDownloader:
         """Create database indexes for better query performance"""
         logger.info("⚡ Creating database indexes for performance...")
 
+        # The API opens this database read-only, so indexes must be built here
         indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_plays_passer ON plays(passer_player_name)",
-            "CREATE INDEX IF NOT EXISTS idx_plays_season ON plays(season)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_plays_game_play ON plays(game_id, play_id)",
+            # Passer lookups plus the usual attempt filters, so counts like
+            # "dropbacks that were not sacks" never touch the table rows
+            "CREATE INDEX IF NOT EXISTS idx_plays_qb_filters ON plays(passer_player_name, season_type, qb_dropback, sack, penalty)",
+            "CREATE INDEX IF NOT EXISTS idx_plays_rusher ON plays(rusher_player_name)",
+            "CREATE INDEX IF NOT EXISTS idx_plays_receiver ON plays(receiver_player_name)",
+            "CREATE INDEX IF NOT EXISTS idx_plays_sack ON plays(sack_player_name)",
+            "CREATE INDEX IF NOT EXISTS idx_plays_season_type ON plays(season, season_type)",
             "CREATE INDEX IF NOT EXISTS idx_plays_week ON plays(week)",
             "CREATE INDEX IF NOT EXISTS idx_plays_team ON plays(posteam)",
+            "CREATE INDEX IF NOT EXISTS idx_plays_season_team_down ON plays(season, posteam, down, qb_dropback)",
+            "CREATE INDEX IF NOT EXISTS idx_plays_defteam ON plays(defteam)",
             "CREATE INDEX IF NOT EXISTS idx_weekly_player ON weekly_stats(player_name)",
             "CREATE INDEX IF NOT EXISTS idx_weekly_season ON weekly_stats(season)",
             "CREATE INDEX IF NOT EXISTS idx_seasonal_player ON seasonal_stats(player_name)",
             "CREATE INDEX IF NOT EXISTS idx_seasonal_season ON seasonal_stats(season)",
         ]
 
+        # Loading is done; switch back to the WAL settings the API expects
+        applyPragmas(self.conn, "high_performance")
+        # 512 MB of page cache so each index sort stays in memory
+        self.conn.execute(f"PRAGMA cache_size=-{INDEX_BUILD_CACHE_KIB}")
+
+        # One write transaction for every index; a failing statement only
+        # rolls back itself, not the indexes already built
+        self.conn.execute("BEGIN IMMEDIATE")
+
         for index_sql in indexes:
             try:
                 self.conn.execute(index_sql)
@@ -237,6 +315,11 @@ class NFLDataDownloader:
 
         self.conn.commit()
 
+        # Planner statistics so SQLite actually picks the new indexes
+        logger.info("📈 Analyzing tables...")
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+
     def print_download_summary(self):
         """Print a summary of the download operation"""
         logger.info("\n" + "=" * 60)
@@ -254,10 +337,10 @@ class NFLDataDownloader:
         tables = cursor.fetchall()
         logger.info(f"📊 Number of tables: {len(tables)}")
 
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
+        # Every table's row count in one compound statement
+        table_names = [table[0] for table in tables]
+        count_sql = " UNION ALL ".join(f'SELECT ?, COUNT(*) FROM "{table_name}"' for table_name in table_names)
+        for table_name, count in cursor.execute(count_sql, table_names):
             logger.info(f"   📋 {table_name}: {count:,} rows")
 
         logger.info("\n🎉 Your NFL database is ready for legendary queries!")
@@ -269,11 +352,20 @@ class NFLDataDownloader:
         logger.info("This will take a while, but it's going to be AMAZING!")
 
         try:
-            self.download_core_data()
-            self.download_roster_data()
-            self.download_advanced_analytics()
-            self.download_context_data()
-            self.download_static_data()
+            # The groups hit different endpoints and write different tables,
+            # so they download in parallel; writes are serialized by write_table
+            groups = [
+                self.download_core_data,
+                self.download_roster_data,
+                self.download_advanced_analytics,
+                self.download_context_data,
+                self.download_static_data,
+            ]
+            with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+                futures = [pool.submit(group) for group in groups]
+                for future in as_completed(futures):
+                    future.result()
+
             self.create_indexes()
             self.print_download_summary()
 
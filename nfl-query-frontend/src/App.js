@@ -110,8 +110,7 @@ const ResultsTable = ({ data, columns, timing, rowsReturned }) => {
   const downloadCSV = () => {
     const headers = columns.join(',');
     const rows = data.map(row => 
-      columns.map(col => {
-        const value = row[col];
+      row.map(value => {
         return typeof value === 'string' && value.includes(',') 
           ? `"${value}"` 
           : value;
@@ -156,11 +155,11 @@ const ResultsTable = ({ data, columns, timing, rowsReturned }) => {
           <tbody>
             {data.map((row, index) => (
               <tr key={index}>
-                {columns.map(col => (
+                {columns.map((col, colIndex) => (
                   <td key={col}>
-                    {typeof row[col] === 'number' && col !== 'season' ?
-                      Number(row[col]).toLocaleString() : 
-                      row[col]
+                    {typeof row[colIndex] === 'number' && col !== 'season' ?
+                      Number(row[colIndex]).toLocaleString() : 
+                      row[colIndex]
                     }
                   </td>
                 ))}
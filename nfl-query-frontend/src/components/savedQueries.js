@@ -2,10 +2,15 @@ import React, { useState, useEffect } from 'react';
 import './savedQueries.css';
 
 const API_BASE_URL = '/api';
+// Queries per request to /queries; the API caps a page at 500
+const PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 500;
 
 const SavedQueries = ({ token, onLoadQuery, currentQuery, onQuerySaved }) => {
   const [savedQueries, setSavedQueries] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [hasMore, setHasMore] = useState(false);
   const [error, setError] = useState(null);
   const [editingId, setEditingId] = useState(null);
   const [editName, setEditName] = useState('');
@@ -18,22 +23,29 @@ const SavedQueries = ({ token, onLoadQuery, currentQuery, onQuerySaved }) => {
     }
   }, [token]);
 
+  const fetchQueriesPage = async (limit, offset) => {
+    const response = await fetch(`${API_BASE_URL}/queries?limit=${limit}&offset=${offset}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`,
+        'Content-Type': 'application/json'
+      }
+    });
+
+    return response.json();
+  };
+
+  // Reloads from the top, keeping as many queries as are already shown
   const loadSavedQueries = async () => {
     setLoading(true);
     setError(null);
 
     try {
-      const response = await fetch(`${API_BASE_URL}/queries`, {
-        headers: {
-          'Authorization': `Bearer ${token}`,
-          'Content-Type': 'application/json'
-        }
-      });
-
-      const data = await response.json();
+      const limit = Math.min(Math.max(PAGE_SIZE, savedQueries.length), MAX_PAGE_SIZE);
+      const data = await fetchQueriesPage(limit, 0);
 
       if (data.success) {
         setSavedQueries(data.queries || []);
+        setHasMore(Boolean(data.hasMore));
       } else {
         setError(data.message || 'Failed to load queries');
       }
@@ -45,6 +57,27 @@ const SavedQueries = ({ token, onLoadQuery, currentQuery, onQuerySaved }) => {
     }
   };
 
+  const loadMoreQueries = async () => {
+    setLoadingMore(true);
+    setError(null);
+
+    try {
+      const data = await fetchQueriesPage(PAGE_SIZE, savedQueries.length);
+
+      if (data.success) {
+        setSavedQueries([...savedQueries, ...(data.queries || [])]);
+        setHasMore(Boolean(data.hasMore));
+      } else {
+        setError(data.message || 'Failed to load queries');
+      }
+    } catch (err) {
+      setError('Failed to load saved queries');
+      console.error('Load queries error:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const saveCurrentQuery = async () => {
     if (!currentQuery || !newQueryName.trim()) {
       setError('Please enter a name for the query');
@@ -267,6 +300,15 @@ const SavedQueries = ({ token, onLoadQuery, currentQuery, onQuerySaved }) => {
               )}
             </div>
           ))}
+          {hasMore && (
+            <button
+              onClick={loadMoreQueries}
+              disabled={loadingMore}
+              className="load-more-btn"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </div>
@@ -12,6 +12,10 @@ import logging
 from datetime import datetime, timedelta
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from database.bulk import bulkInsert
+from database.pragmas import applyPragmas
 
 
 logging.basicConfig(
@@ -24,6 +28,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# PRAGMA auto_vacuum value for INCREMENTAL
+INCREMENTAL_AUTO_VACUUM = 2
+
 
 class NFLDataUpdater:
     def __init__(self, db_path: str = "nfl_complete_database.db"):
@@ -34,6 +41,7 @@ class NFLDataUpdater:
             raise FileNotFoundError(f"Database {db_path} does not exist. Run full download first.")
 
         self.conn = sqlite3.connect(db_path)
+        applyPragmas(self.conn)
         self.current_year = datetime.now().year
 
     def get_current_season_info(self):
@@ -47,24 +55,38 @@ class NFLDataUpdater:
         logger.info(f"Current season: {season}")
         return season
 
+    def replace_seasons(self, df: pd.DataFrame, table_name: str, seasons: list):
+        """Swap the given seasons' rows for df, all or nothing, inside the caller's transaction"""
+        placeholders = ",".join("?" * len(seasons))
+        self.conn.execute("SAVEPOINT replace_seasons")
+        try:
+            self.conn.execute(f"DELETE FROM {table_name} WHERE season IN ({placeholders})", tuple(seasons))
+            bulkInsert(self.conn, df, table_name)
+        except Exception:
+            self.conn.execute("ROLLBACK TO replace_seasons")
+            raise
+        finally:
+            self.conn.execute("RELEASE replace_seasons")
+
     def update_current_season(self):
         season = self.get_current_season_info()
         years = [season]
 
         logger.info("Starting update...")
 
+        # One transaction for every table, so the update costs a single sync.
+        # A failed section only rolls back its own savepoint
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self._update_season_tables(years)
+
+    def _update_season_tables(self, years: list):
         # Play-by-Play Data
         logger.info("Updating play-by-play data...")
         start_time = time.time()
         try:
             pbp_data = nfl.import_pbp_data(years, downcast=True)
-
-
-            self.conn.execute(f"DELETE FROM plays WHERE season = {season}")
-            self.conn.commit()
-
-
-            pbp_data.to_sql('plays', self.conn, if_exists='append', index=False)
+            self.replace_seasons(pbp_data, 'plays', years)
             elapsed = time.time() - start_time
             logger.info(f"Play-by-play updated in {elapsed:.1f}s - {len(pbp_data):,} plays")
         except Exception as e:
@@ -75,11 +97,7 @@ class NFLDataUpdater:
         start_time = time.time()
         try:
             weekly_data = nfl.import_weekly_data(years, downcast=True)
-
-            self.conn.execute(f"DELETE FROM weekly_stats WHERE season = {season}")
-            self.conn.commit()
-
-            weekly_data.to_sql('weekly_stats', self.conn, if_exists='append', index=False)
+            self.replace_seasons(weekly_data, 'weekly_stats', years)
             elapsed = time.time() - start_time
             logger.info(f"Weekly stats updated in {elapsed:.1f}s - {len(weekly_data):,} records")
         except Exception as e:
@@ -90,11 +108,7 @@ class NFLDataUpdater:
         start_time = time.time()
         try:
             seasonal_data = nfl.import_seasonal_data(years)
-
-            self.conn.execute(f"DELETE FROM seasonal_stats WHERE season = {season}")
-            self.conn.commit()
-
-            seasonal_data.to_sql('seasonal_stats', self.conn, if_exists='append', index=False)
+            self.replace_seasons(seasonal_data, 'seasonal_stats', years)
             elapsed = time.time() - start_time
             logger.info(f"Seasonal stats updated in {elapsed:.1f}s - {len(seasonal_data):,} records")
         except Exception as e:
@@ -106,15 +120,11 @@ class NFLDataUpdater:
         try:
             # Seasonal rosters
             seasonal_rosters = nfl.import_seasonal_rosters(years)
-            self.conn.execute(f"DELETE FROM seasonal_rosters WHERE season = {season}")
-            self.conn.commit()
-            seasonal_rosters.to_sql('seasonal_rosters', self.conn, if_exists='append', index=False)
+            self.replace_seasons(seasonal_rosters, 'seasonal_rosters', years)
 
             # Weekly rosters
             weekly_rosters = nfl.import_weekly_rosters(years)
-            self.conn.execute(f"DELETE FROM weekly_rosters WHERE season = {season}")
-            self.conn.commit()
-            weekly_rosters.to_sql('weekly_rosters', self.conn, if_exists='append', index=False)
+            self.replace_seasons(weekly_rosters, 'weekly_rosters', years)
 
             elapsed = time.time() - start_time
             logger.info(f"Rosters updated in {elapsed:.1f}s")
@@ -126,9 +136,7 @@ class NFLDataUpdater:
         start_time = time.time()
         try:
             schedules = nfl.import_schedules(years)
-            self.conn.execute(f"DELETE FROM schedules WHERE season = {season}")
-            self.conn.commit()
-            schedules.to_sql('schedules', self.conn, if_exists='append', index=False)
+            self.replace_seasons(schedules, 'schedules', years)
             elapsed = time.time() - start_time
             logger.info(f"Schedule updated in {elapsed:.1f}s - {len(schedules):,} games")
         except Exception as e:
@@ -142,24 +150,38 @@ class NFLDataUpdater:
 
         # Next Gen Stats
         ngs_types = ['passing', 'rushing', 'receiving']
-        for stat_type in ngs_types:
-            try:
-                logger.info(f"⚡ Updating NGS {stat_type}...")
-                ngs_data = nfl.import_ngs_data(stat_type, years)
 
-                self.conn.execute(f"DELETE FROM ngs_{stat_type} WHERE season = {season}")
-                self.conn.commit()
+        # The three downloads run at once; writes stay on this thread's connection
+        with ThreadPoolExecutor(max_workers=len(ngs_types)) as pool:
+            futures = {}
+            for stat_type in ngs_types:
+                logger.info(f"⚡ Updating NGS {stat_type}...")
+                futures[pool.submit(nfl.import_ngs_data, stat_type, years)] = stat_type
 
-                ngs_data.to_sql(f'ngs_{stat_type}', self.conn, if_exists='append', index=False)
-                logger.info(f"NGS {stat_type} updated")
-            except Exception as e:
-                logger.error(f"NGS {stat_type} update failed: {e}")
+            for future in as_completed(futures):
+                stat_type = futures[future]
+                try:
+                    self.replace_seasons(future.result(), f'ngs_{stat_type}', years)
+                    logger.info(f"NGS {stat_type} updated")
+                except Exception as e:
+                    logger.error(f"NGS {stat_type} update failed: {e}")
 
     def vacuum_database(self):
         logger.info("Optimizing database...")
         try:
-            self.conn.execute("VACUUM")
+            if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == INCREMENTAL_AUTO_VACUUM:
+                # Only releases the pages freed by today's season replace
+                self.conn.executescript("PRAGMA incremental_vacuum;")
+            else:
+                # Older files: one full VACUUM converts them to incremental mode
+                self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                self.conn.execute("VACUUM")
+
+            # Refresh planner statistics for the replaced seasons; PRAGMA optimize
+            # can skip tables whose row counts barely moved
+            self.conn.execute("ANALYZE")
             self.conn.commit()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
             logger.info("Database optimized")
         except Exception as e:
             logger.error(f"Vacuum failed: {e}")
@@ -176,7 +198,7 @@ class NFLDataUpdater:
         cursor.execute("SELECT MAX(season) FROM plays")
         latest_season = cursor.fetchone()[0]
 
-        cursor.execute(f"SELECT COUNT(*) FROM plays WHERE season = {latest_season}")
+        cursor.execute("SELECT COUNT(*) FROM plays WHERE season = ?", (latest_season,))
         plays_count = cursor.fetchone()[0]
 
         logger.info(f"Latest season: {latest_season}")
@@ -1,128 +1,283 @@
+import asyncio
 import time
 import re
 import logging
-from typing import Optional, Dict, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from database.connection import DatabaseConnection
+from database.pool import DEFAULT_POOL_SIZE
 from llm.provider import LLMProvider
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Row cap applied to generated queries that don't set their own LIMIT
+MAX_RESULT_ROWS = 1000
+_TRAILING_LIMIT_RE = re.compile(r"\bLIMIT\s+(\d+)(?:\s*(,|OFFSET)\s*(\d+))?\s*;?\s*(?:--[^\n]*\s*)*$", re.IGNORECASE)
+# Literals, quoted names and comments are matched whole so a LIMIT or a
+# parenthesis inside them is never mistaken for part of the statement
+_SQL_TOKEN_RE = re.compile(r"'(?:[^']|'')*'?|\"(?:[^\"]|\"\")*\"?|`[^`]*`?|\[[^\]]*\]?"
+                           r"|--[^\n]*|/\*.*?(?:\*/|\Z)|[()]|\w+", re.DOTALL)
+
+# Results of identical generated SQL are reused until the data may have changed
+RESULT_CACHE_SIZE = 512
+RESULT_CACHE_TTL = 3600
+
+# Rows per event on the streaming endpoint
+STREAM_BATCH_ROWS = 100
+
+# Precompiled so SQL extraction is a single regex scan of the LLM response
+_SQL_FENCE_RE = re.compile(r"```sql\s*(.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+_BARE_SELECT_RE = re.compile(r"^[ \t]*(SELECT\b.*?;|SELECT\b.*)", re.DOTALL | re.IGNORECASE | re.MULTILINE)
+
+# Whole words only, so columns like updated_at or created_by pass validation
+_READ_STATEMENT_RE = re.compile(r"\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+_RISK_KEYWORD_RE = re.compile(r"\b(?:DROP|DELETE|INSERT|UPDATE|ALTER|CREATE|TRUNCATE|EXEC|ATTACH|DETACH|PRAGMA)\b",
+                              re.IGNORECASE)
+
+# Start offsets of the LIMIT keywords outside any parentheses, i.e. the ones
+# that apply to the whole statement rather than a subquery or CTE
+def _topLevelLimits(sql: str) -> List[int]:
+    positions = []
+    depth = 0
+
+    for token in _SQL_TOKEN_RE.finditer(sql):
+        text = token.group()
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        elif depth == 0 and text.upper() == "LIMIT":
+            positions.append(token.start())
+
+    return positions
+
+
+# Timings use the monotonic clock in integer nanoseconds, so wall-clock
+# adjustments can't skew them; the API still reports seconds
+def _secondsSince(startNs: int) -> float:
+    return (time.perf_counter_ns() - startNs) / 1e9
+
+
 class QueryProcessor(DatabaseConnection):
-    def __init__(self, db_path: str, llm_provider: LLMProvider):
-        super().__init__(db_path)
+    def __init__(self, db_path: str, llm_provider: LLMProvider, poolSize: int = DEFAULT_POOL_SIZE, minIdle: int = 0):
+        super().__init__(db_path, poolSize=poolSize, minIdle=minIdle)
         self._llm_provider = llm_provider
         self._queryHistory = []
         self._successfulQueries = 0
         self._failedQueries = 0
+        self._resultCache = TTLCache(maxSize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+
+    def connect(self):
+        # A reconnect may point at a rebuilt database
+        self._resultCache.clear()
+        super().connect()
+
+    def _runCachedQuery(self, sql: str):
+        # Whitespace-only normalization; case matters inside string literals
+        cacheKey = " ".join(sql.split())
+
+        cached = self._resultCache.get(cacheKey)
+        if cached is not None:
+            return cached
+
+        result = self.executeQuery(sql, resultFormat="tuples")
+        self._resultCache.set(cacheKey, result)
+
+        return result
 
     def _extractSQL(self, llmResponse: str) -> Optional[str]:
-        if "```sql" in llmResponse:
-            try:
-                return llmResponse.split("```sql")[1].split("```")[0].strip()
-            except IndexError:
-                pass
+        # Common shape: a closed, lowercase ```sql fence, found with two plain finds
+        fenceStart = llmResponse.find("```sql")
+        if fenceStart != -1:
+            fenceEnd = llmResponse.find("```", fenceStart + 6)
+            if fenceEnd != -1:
+                return llmResponse[fenceStart + 6:fenceEnd].strip() or None
 
+        match = _SQL_FENCE_RE.search(llmResponse)
 
-        lines = llmResponse.split("\n")
-        query = ""
-        in_query = False
+        # Fallback: look for a bare SELECT statement
+        if match is None:
+            match = _BARE_SELECT_RE.search(llmResponse)
 
-        # Fallback: look for SELECT statements
-        for line in lines:
-            if line.strip().upper().startswith('SELECT'):
-                in_query = True
-            if in_query:
-                query += line + " "
-                if line.strip().endswith(';'):
-                    return query.strip()
+        if match is None:
+            return None
 
-        return query.strip() if query else None
+        return match.group(1).strip() or None
 
     def _validateSQL(self, sql: str) -> bool:
         if not sql or not sql.strip():
             logger.error("SQL query is empty")
             return False
 
-        sqlUpper = sql.upper().strip()
-
-        if not (sqlUpper.startswith("SELECT") or sqlUpper.startswith("WITH")):
+        if not _READ_STATEMENT_RE.match(sql):
             logger.error("SQL query is invalid")
             logger.error(f"Raw LLM response was: {sql[:500]}...")
             return False
 
-        riskKeywords = ['DROP', 'DELETE', 'INSERT', 'UPDATE', 'ALTER', 'CREATE', 'TRUNCATE', 'EXEC']
+        # Only one statement may run; anything after a ';' is rejected outright.
+        # Only the tail from the first ';' is copied, never the whole query
+        semicolon = sql.find(";")
+        if semicolon != -1 and sql[semicolon:].rstrip().strip(";"):
+            logger.error("SQL query contains multiple statements")
+            return False
 
-        for keyword in riskKeywords:
-            if keyword in sqlUpper:
-                logger.error("Prevented dropping table information")
-                return False
+        if _RISK_KEYWORD_RE.search(sql):
+            logger.error("Prevented dropping table information")
+            return False
 
         return True
 
+    # Caps the row count at MAX_RESULT_ROWS on the statement itself; wrapping
+    # it in a subquery would rename duplicate output columns (name, name:1)
+    def _enforceLimit(self, sql: str) -> str:
+        sql = sql.strip()
+        topLevelLimits = _topLevelLimits(sql)
+        match = _TRAILING_LIMIT_RE.search(sql)
+
+        if match and match.start() in topLevelLimits:
+            first, separator, second = match.groups()
+            # "LIMIT offset, count" lists the offset first
+            count, offset = (second, first) if separator == "," else (first, second)
+
+            limit = f"LIMIT {min(int(count), MAX_RESULT_ROWS)}"
+            if offset is not None:
+                limit += f" OFFSET {offset}"
+
+            return sql[:match.start()] + limit
+
+        # A top-level LIMIT that isn't a plain number, e.g. LIMIT (SELECT ...),
+        # can't be rewritten or followed by a second one, so only then is the
+        # query wrapped
+        if topLevelLimits:
+            return f"SELECT * FROM (\n{sql.rstrip(';')}\n) LIMIT {MAX_RESULT_ROWS}"
+
+        # The newline keeps a trailing "--" comment from swallowing the clause
+        return f"{sql.rstrip(';').rstrip()}\nLIMIT {MAX_RESULT_ROWS}"
 
-    def processInput(self, query: str, includeSQL: bool = False) -> Dict[str, Any]:
+
+    # Asks the provider for SQL and checks it. Returns the runnable SQL, or the
+    # failure response to send back instead
+    async def _prepareSQL(self, query: str, includeSQL: bool, responseTime: Dict[str, float],
+                          llmProvider: LLMProvider) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        llmStart = time.perf_counter_ns()
+        llmResponse = await llmProvider.generateSQL(query)
+        responseTime['llm_time'] = _secondsSince(llmStart)
+
+        if not llmResponse:
+            logger.error(f"Service could not reach provider")
+            self._failedQueries += 1
+            return None, {
+                'success': False,
+                'error': "Service could not reach provider"
+            }
+
+        sqlQuery = self._extractSQL(llmResponse)
+
+        if not sqlQuery:
+            logger.error(f"Service could not extract SQL query")
+            logger.error(f"Raw LLM response was: {llmResponse[:500]}...")
+            self._failedQueries += 1
+            await llmProvider.forgetResponse(query)
+            return None, {
+                'success': False,
+                'error': "Service could not extract SQL query",
+                'rawResponse': llmResponse if includeSQL else None
+            }
+
+        if not self._validateSQL(sqlQuery):
+            logger.error(f"Service could not extract SQL query")
+            self._failedQueries += 1
+            await llmProvider.forgetResponse(query)
+            return None, {
+                'success': False,
+                'error': "Service could not validate SQL query",
+                'sqlQuery': sqlQuery if includeSQL else None
+            }
+
+        return self._enforceLimit(sqlQuery), None
+
+
+    # The provider call is awaited and blocking SQLite work runs in a worker
+    # thread, so concurrent requests keep moving on the event loop.
+    # llmProvider overrides the default provider for this one query
+    async def processInput(self, query: str, includeSQL: bool = False,
+                           llmProvider: Optional[LLMProvider] = None) -> Dict[str, Any]:
+        llmProvider = llmProvider or self._llm_provider
         responseTime = {}
         sqlQuery = None
 
         try:
-            llmStart = time.time()
-            llmResponse = self._llm_provider.generateSQL(query)
-            responseTime['llm_time'] = time.time() - llmStart
-
-            if not llmResponse:
-                logger.error(f"Service could not reach provider")
-                self._failedQueries += 1
-                return {
-                    'success': False,
-                    'error': "Service could not reach provider"
-                }
-
-            sqlQuery = self._extractSQL(llmResponse)
-
-            if not sqlQuery:
-                logger.error(f"Service could not extract SQL query")
-                logger.error(f"Raw LLM response was: {llmResponse[:500]}...")
-                self._failedQueries += 1
-                return {
-                    'success': False,
-                    'error': "Service could not extract SQL query",
-                    'rawResponse': llmResponse if includeSQL else None
-                }
-
-            if not self._validateSQL(sqlQuery):
-                logger.error(f"Service could not extract SQL query")
-                self._failedQueries += 1
-                return {
-                    'success': False,
-                    'error': "Service could not validate SQL query",
-                    'sqlQuery': sqlQuery if includeSQL else None
-                }
-
-            dbStart = time.time()
-            df = self.executeQuery(sqlQuery)
+            sqlQuery, failure = await self._prepareSQL(query, includeSQL, responseTime, llmProvider)
+            if failure is not None:
+                return failure
+
+            dbStart = time.perf_counter_ns()
+            columns, rows = await asyncio.to_thread(self._runCachedQuery, sqlQuery)
             self._successfulQueries += 1
-            responseTime['db_time'] = time.time() - dbStart
+            responseTime['db_time'] = _secondsSince(dbStart)
             responseTime['total_time'] = responseTime['llm_time'] + responseTime['db_time']
 
-            data = df.to_dict('records')
-            columns = df.columns.tolist()
-
+            # Columnar: each row is a value array in `columns` order, passed
+            # through as fetched instead of inflated into one dict per row
             return {
                 'success': True,
-                'data': data,
+                'data': rows,
                 'columns': columns,
                 'sqlQuery': sqlQuery if includeSQL else None,
                 'responseTime': responseTime,
-                'rowsReturned': len(data)
+                'rowsReturned': len(rows)
             }
 
         except Exception as e:
             logger.error(f"Service could not reach provider: {e}")
             self._failedQueries += 1
+            await llmProvider.forgetResponse(query)
             return {
                 'success': False,
                 'error': "Service could not reach provider",
                 'responseTime': responseTime,
                 'sqlQuery': sqlQuery if includeSQL else None
             }
+
+
+    # Same pipeline as processInput, emitted as events so a client can show the
+    # SQL as soon as it exists and render rows batch by batch:
+    # sql -> columns -> rows (repeated) -> done, or a single error event
+    async def streamInput(self, query: str, includeSQL: bool = False,
+                          llmProvider: Optional[LLMProvider] = None) -> AsyncIterator[Dict[str, Any]]:
+        llmProvider = llmProvider or self._llm_provider
+        responseTime = {}
+
+        try:
+            sqlQuery, failure = await self._prepareSQL(query, includeSQL, responseTime, llmProvider)
+            if failure is not None:
+                yield {'event': 'error', **failure, 'timing': responseTime}
+                return
+
+            yield {'event': 'sql', 'sqlQuery': sqlQuery if includeSQL else None, 'timing': dict(responseTime)}
+
+            dbStart = time.perf_counter_ns()
+            columns, rows = await asyncio.to_thread(self._runCachedQuery, sqlQuery)
+            self._successfulQueries += 1
+            responseTime['db_time'] = _secondsSince(dbStart)
+            responseTime['total_time'] = responseTime['llm_time'] + responseTime['db_time']
+
+            yield {'event': 'columns', 'columns': columns}
+
+            for batchStart in range(0, len(rows), STREAM_BATCH_ROWS):
+                batch = rows[batchStart:batchStart + STREAM_BATCH_ROWS]
+                yield {'event': 'rows', 'data': batch}
+
+            yield {'event': 'done', 'rowsReturned': len(rows), 'timing': responseTime}
+
+        except Exception as e:
+            logger.error(f"Service could not reach provider: {e}")
+            self._failedQueries += 1
+            await llmProvider.forgetResponse(query)
+            yield {
+                'event': 'error',
+                'success': False,
+                'error': "Service could not reach provider",
+                'timing': responseTime
+            }
@@ -21,4 +21,4 @@ fi
 
 # Start server
 cd /app
-uvicorn main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+uvicorn main:app --host 0.0.0.0 --port 8000 --workers "${WEB_CONCURRENCY:-1}" --loop uvloop --http httptools --no-access-log
\ No newline at end of file
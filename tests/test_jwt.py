@@ -0,0 +1,146 @@
+import hashlib
+import hmac
+import time
+
+import orjson
+import pytest
+
+from utils import jwt
+from utils.cache import TTLCache
+
+TEST_SECRET = "test-secret"
+
+# Issued by python-jose (jwt.encode({"sub": "jose-user", "exp": 4102444800},
+# TEST_SECRET, algorithm="HS256")) before it was replaced
+JOSE_TOKEN = ("eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9"
+              ".eyJzdWIiOiJqb3NlLXVzZXIiLCJleHAiOjQxMDI0NDQ4MDB9"
+              ".VSHNsZZLt2eiAnW0m4s9YjTAVKl9wILGcnVZjI4UgaA")
+
+
+@pytest.fixture(autouse=True)
+def testSecret(monkeypatch):
+    monkeypatch.setattr(jwt, "_hmacTemplate", hmac.new(TEST_SECRET.encode("utf-8"), digestmod=hashlib.sha256))
+    monkeypatch.setattr(jwt, "_tokenCache", TTLCache(maxSize=16, ttl=60))
+
+
+# Signs an arbitrary header and payload with the test secret
+def forgeToken(header: dict, payload) -> str:
+    signingInput = jwt._b64encode(orjson.dumps(header)) + b"." + jwt._b64encode(orjson.dumps(payload))
+    return (signingInput + b"." + jwt._b64encode(jwt._sign(signingInput))).decode("ascii")
+
+
+def testRoundTrip():
+    token = jwt.createAccessToken({"sub": "alice"})
+
+    assert jwt.verifyToken(token) == "alice"
+    # Second call is answered from the cache
+    assert jwt.verifyToken(token) == "alice"
+
+    payload = jwt._decodeToken(token)
+    assert payload["sub"] == "alice"
+    assert abs(payload["exp"] - (time.time() + jwt.ACCESS_TOKEN_EXPIRE_MINUTES * 60)) < 5
+
+
+def testTamperedSignature():
+    token = jwt.createAccessToken({"sub": "alice"})
+    header, payload, signature = token.split(".")
+    flipped = ("A" if signature[0] != "A" else "B") + signature[1:]
+
+    assert jwt.verifyToken(f"{header}.{payload}.{flipped}") is None
+
+
+def testTamperedPayload():
+    token = jwt.createAccessToken({"sub": "alice"})
+    header, _, signature = token.split(".")
+    payload = jwt._b64encode(orjson.dumps({"sub": "mallory", "exp": int(time.time()) + 60})).decode("ascii")
+
+    assert jwt.verifyToken(f"{header}.{payload}.{signature}") is None
+
+
+def testWrongSecret():
+    token = jwt.createAccessToken({"sub": "alice"})
+
+    jwt._hmacTemplate = hmac.new(b"another-secret", digestmod=hashlib.sha256)
+    assert jwt.verifyToken(token) is None
+
+
+@pytest.mark.parametrize("header", [
+    {"alg": "none", "typ": "JWT"},
+    {"alg": "HS512", "typ": "JWT"},
+    {"typ": "JWT"},
+])
+def testWrongAlgorithmHeader(header):
+    token = forgeToken(header, {"sub": "alice", "exp": int(time.time()) + 60})
+
+    assert jwt.verifyToken(token) is None
+
+
+def testUnsignedAlgNoneToken():
+    header = jwt._b64encode(orjson.dumps({"alg": "none", "typ": "JWT"})).decode("ascii")
+    payload = jwt._b64encode(orjson.dumps({"sub": "alice"})).decode("ascii")
+
+    assert jwt.verifyToken(f"{header}.{payload}.") is None
+
+
+def testExpiredToken():
+    token = jwt.createAccessToken({"sub": "alice"}, expiresMinutes=-1)
+
+    assert jwt.verifyToken(token) is None
+
+
+def testNonNumericExpiry():
+    token = forgeToken({"alg": "HS256", "typ": "JWT"}, {"sub": "alice", "exp": "never"})
+
+    assert jwt.verifyToken(token) is None
+
+
+# Tokens without exp are accepted, like python-jose did, but never cached
+def testTokenWithoutExpiry():
+    token = forgeToken({"alg": "HS256", "typ": "JWT"}, {"sub": "alice"})
+
+    assert jwt.verifyToken(token) == "alice"
+    assert jwt._tokenCache.get(jwt.tokenFingerprint(token)) is None
+
+
+def testTokenWithoutSubject():
+    token = jwt.createAccessToken({"role": "admin"})
+
+    assert jwt.verifyToken(token) is None
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "not-a-token",
+    "a.b",
+    "a.b.c.d",
+    "a.b.c",
+    "!!!.@@@.###",
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.é.abc",
+])
+def testMalformedBase64(token):
+    assert jwt.verifyToken(token) is None
+
+
+def testMalformedJson():
+    signingInput = jwt._HEADER_B64 + b"." + jwt._b64encode(b"{not json")
+    token = (signingInput + b"." + jwt._b64encode(jwt._sign(signingInput))).decode("ascii")
+
+    assert jwt.verifyToken(token) is None
+
+
+def testMalformedHeaderJson():
+    token = forgeToken({"alg": "HS256"}, {"sub": "alice"})
+    _, payload, signature = token.split(".")
+    header = jwt._b64encode(b"[1, 2").decode("ascii")
+
+    assert jwt.verifyToken(f"{header}.{payload}.{signature}") is None
+
+
+def testNonObjectPayload():
+    token = forgeToken({"alg": "HS256", "typ": "JWT"}, ["alice"])
+
+    assert jwt.verifyToken(token) is None
+
+
+def testDecodesPythonJoseToken():
+    assert jwt.verifyToken(JOSE_TOKEN) == "jose-user"
@@ -0,0 +1,151 @@
+import sqlite3
+
+import pytest
+
+from services.queryProcessor import MAX_RESULT_ROWS, QueryProcessor
+
+
+class StubProvider:
+    async def generateSQL(self, query):
+        return None
+
+    async def forgetResponse(self, query):
+        pass
+
+    def getProviderName(self):
+        return "Stub"
+
+
+@pytest.fixture
+def processor():
+    return QueryProcessor(":memory:", StubProvider())
+
+
+@pytest.fixture
+def plays():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE plays (id INTEGER, name TEXT)")
+    connection.executemany("INSERT INTO plays VALUES (?, ?)", [(i, f"player {i}") for i in range(3000)])
+    yield connection
+    connection.close()
+
+
+def run(connection, sql):
+    cursor = connection.execute(sql)
+    return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+# _enforceLimit
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM plays LIMIT 100000", "SELECT * FROM plays LIMIT 1000"),
+    ("SELECT * FROM plays limit 5;", "SELECT * FROM plays LIMIT 5"),
+    ("SELECT * FROM plays LIMIT 10 OFFSET 20", "SELECT * FROM plays LIMIT 10 OFFSET 20"),
+    ("SELECT * FROM plays LIMIT 5000 OFFSET 20", "SELECT * FROM plays LIMIT 1000 OFFSET 20"),
+    # "LIMIT offset, count" form
+    ("SELECT * FROM plays LIMIT 20, 5000", "SELECT * FROM plays LIMIT 1000 OFFSET 20"),
+    ("SELECT * FROM plays LIMIT 5 -- five rows", "SELECT * FROM plays LIMIT 5"),
+])
+def testExistingLimitIsCapped(processor, sql, expected):
+    assert processor._enforceLimit(sql) == expected
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM plays",
+    "SELECT * FROM plays;",
+    "SELECT * FROM plays -- all of them",
+    "SELECT * FROM plays -- LIMIT 5",
+    "SELECT * FROM plays WHERE id IN (SELECT id FROM plays LIMIT 3)",
+    "SELECT * FROM plays WHERE name = 'LIMIT 5'",
+    "WITH recent AS (SELECT * FROM plays LIMIT 2) SELECT * FROM recent UNION ALL SELECT * FROM plays",
+])
+def testMissingLimitIsAppended(processor, sql):
+    enforced = processor._enforceLimit(sql)
+
+    assert not enforced.startswith("SELECT * FROM (")
+    assert enforced.endswith(f"\nLIMIT {MAX_RESULT_ROWS}")
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM plays LIMIT (SELECT 5000)",
+    "SELECT * FROM plays LIMIT 2 + 3",
+    "SELECT * FROM plays LIMIT (SELECT 5000) OFFSET (1)",
+])
+def testNonNumericLimitIsWrapped(processor, plays, sql):
+    enforced = processor._enforceLimit(sql)
+
+    assert enforced.startswith("SELECT * FROM (")
+    assert len(run(plays, enforced)[1]) <= MAX_RESULT_ROWS
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM plays LIMIT 100000",
+    "SELECT * FROM plays LIMIT 20, 5000",
+    "SELECT * FROM plays -- LIMIT 5",
+    "SELECT * FROM plays LIMIT (SELECT 5000)",
+    "SELECT * FROM plays WHERE id IN (SELECT id FROM plays LIMIT 3);",
+    "WITH recent AS (SELECT * FROM plays LIMIT 2) SELECT * FROM recent UNION ALL SELECT * FROM plays",
+])
+def testEnforcedQueriesRun(processor, plays, sql):
+    columns, rows = run(plays, processor._enforceLimit(sql))
+
+    assert len(rows) <= MAX_RESULT_ROWS
+
+
+def testDuplicateColumnNamesSurvive(processor, plays):
+    sql = "SELECT a.name, b.name FROM plays a JOIN plays b ON a.id = b.id"
+
+    columns, rows = run(plays, processor._enforceLimit(sql))
+
+    assert columns == ["name", "name"]
+    assert len(rows) == MAX_RESULT_ROWS
+
+
+# _extractSQL
+
+@pytest.mark.parametrize("response, expected", [
+    ("Here you go:\n```sql\nSELECT * FROM plays\n```\nThis lists plays.", "SELECT * FROM plays"),
+    ("```SQL\nSELECT 1\n```", "SELECT 1"),
+    # Stream cut off before the closing fence
+    ("```sql\nSELECT * FROM plays", "SELECT * FROM plays"),
+    ("The query is:\nSELECT name FROM plays; and that is all", "SELECT name FROM plays;"),
+    ("SELECT name\nFROM plays", "SELECT name\nFROM plays"),
+])
+def testExtractSQL(processor, response, expected):
+    assert processor._extractSQL(response) == expected
+
+
+@pytest.mark.parametrize("response", [
+    "I can't answer that.",
+    "```sql\n```",
+    "",
+])
+def testExtractSQLWithoutQuery(processor, response):
+    assert processor._extractSQL(response) is None
+
+
+# _validateSQL
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM plays",
+    "  select name from plays;",
+    "WITH recent AS (SELECT * FROM plays) SELECT * FROM recent",
+    "SELECT updated_at, created_by FROM plays",
+    "SELECT * FROM plays;;\n",
+])
+def testValidSQL(processor, sql):
+    assert processor._validateSQL(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "",
+    "   ",
+    "DELETE FROM plays",
+    "PRAGMA table_info(plays)",
+    "SELECT * FROM plays; DROP TABLE plays",
+    "SELECT * FROM plays; SELECT 1",
+    "WITH x AS (DELETE FROM plays RETURNING *) SELECT * FROM x",
+    "SELECT * FROM plays WHERE 1; ATTACH DATABASE 'x' AS y",
+])
+def testInvalidSQL(processor, sql):
+    assert not processor._validateSQL(sql)
@@ -0,0 +1,171 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from database import userDB
+from database.userDB import UserDatabase
+
+
+@pytest.fixture
+def database(tmp_path):
+    userDatabase = UserDatabase(str(tmp_path / "users.db"))
+    userDatabase.createTable()
+    yield userDatabase
+    userDatabase.close()
+
+
+# Holds the write lock from another connection so queued writes pile up
+# and reach the writer thread as one batch once it is released
+class WriteLockHolder:
+    def __init__(self, dbPath: str):
+        self._connection = sqlite3.connect(dbPath, isolation_level=None, check_same_thread=False)
+        self._connection.execute("BEGIN IMMEDIATE")
+
+    def release(self):
+        self._connection.execute("COMMIT")
+        self._connection.close()
+
+
+def recordBatches(database, monkeypatch):
+    batchSizes = []
+    commitBatch = database._commitBatch
+
+    def recordingCommitBatch(writer, batch):
+        batchSizes.append(len(batch))
+        commitBatch(writer, batch)
+
+    monkeypatch.setattr(database, "_commitBatch", recordingCommitBatch)
+    return batchSizes
+
+
+def submitWhileLocked(database, statementLists):
+    holder = WriteLockHolder(database.dbPath)
+    # The first write blocks in BEGIN IMMEDIATE; the rest queue behind it
+    futures = [database._submit(statements) for statements in statementLists]
+    threading.Timer(0.2, holder.release).start()
+    return futures
+
+
+def testWritesQueuedTogetherShareOneBatch(database, monkeypatch):
+    batchSizes = recordBatches(database, monkeypatch)
+    userID = database.createUser("alice", "alice@example.com", "hash").id
+    batchSizes.clear()
+
+    futures = submitWhileLocked(database, [
+        [(userDB.INSERT_SAVED_QUERY, (userID, f"question {i}", None))] for i in range(20)
+    ])
+
+    results = [future.result(timeout=5) for future in futures]
+
+    assert [result.rows[0]["queryContent"] for result in results] == [f"question {i}" for i in range(20)]
+    assert sum(batchSizes) == 20
+    assert len(batchSizes) < 20
+    assert len(database.getAllSavedQueries(userID)) == 20
+
+
+def testFailedWriteOnlyRollsBackItsOwnSavepoint(database, monkeypatch):
+    batchSizes = recordBatches(database, monkeypatch)
+    database.createUser("alice", "alice@example.com", "hash")
+    batchSizes.clear()
+
+    futures = submitWhileLocked(database, [
+        [(userDB.INSERT_USER, ("bob", "bob@example.com", "hash"))],
+        # Both statements of a failing request are undone together
+        [(userDB.INSERT_USER, ("carol", "carol@example.com", "hash")),
+         (userDB.INSERT_USER, ("alice", "other@example.com", "hash"))],
+        [(userDB.INSERT_USER, ("dave", "dave@example.com", "hash"))],
+    ])
+
+    assert futures[0].result(timeout=5).rows[0]["username"] == "bob"
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5).rows[0]["username"] == "dave"
+
+    assert batchSizes == [3]
+    assert database.getUserByUsername("carol") is None
+    assert database.getUserByUsername("bob") is not None
+    assert database.getUserByUsername("dave") is not None
+
+
+def testSqliteErrorReachesTheCaller(database):
+    database.createUser("alice", "alice@example.com", "hash")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        database.createUser("alice", "again@example.com", "hash")
+
+
+def testUnexpectedErrorOnlyFailsItsWrite(database):
+    database.createUser("alice", "alice@example.com", "hash")
+
+    # Parameters that raise something other than sqlite3.Error while binding
+    class BrokenParams:
+        def __len__(self):
+            return 2
+
+        def __getitem__(self, index):
+            raise RuntimeError("broken parameter")
+
+    with pytest.raises(RuntimeError):
+        database._write(userDB.UPDATE_PASSWORD, BrokenParams())
+
+    # The writer is still running afterwards
+    assert database.updatePassword(1, "new-hash")
+
+
+def testDeadWriterFailsQueuedAndLaterWrites(database, monkeypatch):
+    started = threading.Event()
+    proceed = threading.Event()
+
+    def brokenCommitBatch(writer, batch):
+        started.set()
+        proceed.wait(5)
+        raise RuntimeError("writer crashed")
+
+    monkeypatch.setattr(database, "_commitBatch", brokenCommitBatch)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(database.createUser, "alice", "alice@example.com", "hash")
+        assert started.wait(5)
+        queued = database._submit([(userDB.INSERT_USER, ("bob", "bob@example.com", "hash"))])
+        proceed.set()
+
+        with pytest.raises(RuntimeError):
+            first.result(timeout=5)
+
+    with pytest.raises(ConnectionError):
+        queued.result(timeout=5)
+
+    # Writes after the writer stopped fail immediately instead of hanging
+    with pytest.raises(ConnectionError):
+        database.createUser("carol", "carol@example.com", "hash")
+
+
+def testTimedOutWriteIsNotApplied(database, monkeypatch):
+    monkeypatch.setattr(userDB, "WRITE_TIMEOUT", 0.1)
+    holder = WriteLockHolder(database.dbPath)
+
+    batchSizes = recordBatches(database, monkeypatch)
+
+    # Blocks the writer in BEGIN IMMEDIATE so the next write stays queued
+    blocking = database._submit([(userDB.INSERT_USER, ("alice", "alice@example.com", "hash"))])
+    while not batchSizes:
+        time.sleep(0.01)
+
+    with pytest.raises(TimeoutError):
+        database.createUser("bob", "bob@example.com", "hash")
+
+    holder.release()
+    blocking.result(timeout=10)
+    # Queued after the cancelled write, so it has been skipped by the time this returns
+    monkeypatch.setattr(userDB, "WRITE_TIMEOUT", 5)
+    database.createUser("carol", "carol@example.com", "hash")
+
+    assert database.getUserByUsername("bob") is None
+
+
+def testUnopenableDatabaseFailsConstruction(tmp_path):
+    with pytest.raises(sqlite3.OperationalError):
+        UserDatabase(str(tmp_path / "missing" / "users.db"))
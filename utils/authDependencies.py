@@ -1,17 +1,35 @@
+from functools import lru_cache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from models.user import User
 from database.userDB import UserDatabase
+from utils.cache import TTLCache
 from utils.jwt import verifyToken
 
+# Users keyed by username, so with verifyToken's own cache a repeat request
+# resolves its user without touching SQLite. Keyed by name rather than token
+# so one call drops the entry for every token the user holds. Kept short so
+# changes made elsewhere show up quickly
+USER_CACHE_SIZE = 50000
+USER_CACHE_TTL = 30
+
 _userDb: Optional[UserDatabase] = None
+_userCache = TTLCache(maxSize = USER_CACHE_SIZE, ttl = USER_CACHE_TTL)
 security = HTTPBearer()
 
+# Also primes getUserDatabase, so requests get the database from its cache
 def setUserDatabase(db: UserDatabase):
     global _userDb
     _userDb = db
+    getUserDatabase.cache_clear()
+
+    if db is not None:
+        getUserDatabase()
 
+# Memoized once the database is set; the 503 for a missing database is
+# raised, not cached, so it clears as soon as setUserDatabase runs
+@lru_cache(maxsize = 1)
 def getUserDatabase() -> UserDatabase:
     if _userDb is None:
         raise HTTPException(
@@ -22,8 +40,7 @@ def getUserDatabase() -> UserDatabase:
     return _userDb
 
 def getCurrentUser(credentials: HTTPAuthorizationCredentials = Depends(security), db: UserDatabase = Depends(getUserDatabase)) -> User:
-    token = credentials.credentials
-    username = verifyToken(token)
+    username = verifyToken(credentials.credentials)
 
     if username is None:
         raise HTTPException(
@@ -32,7 +49,7 @@ def getCurrentUser(credentials: HTTPAuthorizationCredentials = Depends(security)
             headers = {"WWW-Authenticate": "Bearer"}
         )
 
-    user = db.getUserByUsername(username)
+    user = _lookupUser(username, db)
 
     if user is None:
         raise HTTPException(
@@ -44,16 +61,31 @@ def getCurrentUser(credentials: HTTPAuthorizationCredentials = Depends(security)
     return user
 
 
+def _lookupUser(username: str, db: UserDatabase) -> Optional[User]:
+    user = _userCache.get(username)
+    if user is not None:
+        return user
+
+    user = db.getUserByUsername(username)
+
+    if user is not None:
+        _userCache.set(username, user)
+
+    return user
+
+
+# Call after changing or deleting a user
+def forgetCachedUser(username: str):
+    _userCache.pop(username)
+
+
 def getOptionalUser(credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error = False)), db: UserDatabase = Depends(getUserDatabase)) -> Optional[User]:
     if credentials is None:
         return None
 
-    token = credentials.credentials
-    username = verifyToken(token)
+    username = verifyToken(credentials.credentials)
 
     if username is None:
         return None
 
-    user = db.getUserByUsername(username)
-
-    return user
\ No newline at end of file
+    return _lookupUser(username, db)
\ No newline at end of file
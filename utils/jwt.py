@@ -1,12 +1,54 @@
+import base64
+import hashlib
+import hmac
 import os
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
+import time
 from typing import Optional
 
+import orjson
+
+from utils.cache import TTLCache
+
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
+# Verified tokens, keyed by tokenFingerprint, so a client sending the
+# same token repeatedly is only checked once a minute. Each entry also
+# carries the token's own expiry, which is always honoured
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 60
+
+_tokenCache = TTLCache(maxSize = TOKEN_CACHE_SIZE, ttl = TOKEN_CACHE_TTL)
+
+# HMAC state with the key already absorbed; each signature works on a copy
+# instead of redoing the key setup
+_hmacTemplate = hmac.new(SECRET_KEY.encode("utf-8"), digestmod = hashlib.sha256)
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+# Fixed-size cache key for a token: 128 bits of SHA-256 instead of the full
+# token string
+def tokenFingerprint(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()[:16]
+
+
+def _sign(signingInput: bytes) -> bytes:
+    mac = _hmacTemplate.copy()
+    mac.update(signingInput)
+    return mac.digest()
+
+
+# Every token we issue has the same header, so it is encoded once
+_HEADER_B64 = _b64encode(orjson.dumps({"alg": ALGORITHM, "typ": "JWT"}))
+
 
 # Takes in a dictionary containing items to encode in the token
 # and the expiry time, set to 24 hours by default
@@ -14,22 +56,64 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
 def createAccessToken(data: dict, expiresMinutes: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
     toEncode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes = expiresMinutes)
-    toEncode["exp"] = expire
+    # NumericDate: integer epoch seconds, no datetime objects involved
+    toEncode["exp"] = int(time.time()) + expiresMinutes * 60
 
-    encodedJwt = jwt.encode(toEncode, SECRET_KEY, algorithm = ALGORITHM)
-    return encodedJwt
+    signingInput = _HEADER_B64 + b"." + _b64encode(orjson.dumps(toEncode))
 
+    return (signingInput + b"." + _b64encode(_sign(signingInput))).decode("ascii")
 
-def verifyToken(token: str) -> Optional[str]:
+
+# Checks the HS256 signature and expiry; returns the claims, or None for any
+# malformed, forged or expired token
+def _decodeToken(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms = [ALGORITHM])
-        username = payload.get("sub")
+        headerPart, payloadPart, signaturePart = token.encode("ascii").split(b".")
+
+        # Our own header needs no parsing; anything else must still say HS256
+        if headerPart != _HEADER_B64:
+            header = orjson.loads(_b64decode(headerPart))
 
-        if username is None:
+            if not isinstance(header, dict) or header.get("alg") != ALGORITHM:
+                return None
+
+        if not hmac.compare_digest(_sign(headerPart + b"." + payloadPart), _b64decode(signaturePart)):
             return None
 
-        return username
+        payload = orjson.loads(_b64decode(payloadPart))
+
+    except ValueError:
+        return None
+
+    if not isinstance(payload, dict):
+        return None
+
+    expiresAt = payload.get("exp")
+    if expiresAt is not None and (not isinstance(expiresAt, (int, float)) or expiresAt < time.time()):
+        return None
+
+    return payload
+
+
+def verifyToken(token: str) -> Optional[str]:
+    cacheKey = tokenFingerprint(token)
+
+    cached = _tokenCache.get(cacheKey)
+    if cached is not None:
+        username, expiresAt = cached
+        if expiresAt > time.time():
+            return username
+
+    payload = _decodeToken(token)
+    if payload is None:
+        return None
+
+    username = payload.get("sub")
+
+    if username is None:
+        return None
+
+    if "exp" in payload:
+        _tokenCache.set(cacheKey, (username, payload["exp"]))
 
-    except JWTError:
-        return None
\ No newline at end of file
+    return username
@@ -1,16 +1,81 @@
+import asyncio
+import hashlib
+import hmac
+import os
+
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+from utils.cache import TTLCache
+
+# Recently verified (password, stored hash) pairs, so repeat logins skip the slow hash.
+# Keys are HMACs under a per-process secret, never the plaintext password, and
+# include the stored hash so a password change invalidates them automatically
+VERIFY_CACHE_SIZE = 10000
+VERIFY_CACHE_TTL = 60
+
+# Argon2id parameters for new hashes, tunable per deployment. They are stored
+# in each hash, so changing them only affects passwords hashed afterwards
+# (including the rehash on a user's next login); memory cost is in KiB
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+
+_hasher = PasswordHasher(time_cost = ARGON2_TIME_COST, memory_cost = ARGON2_MEMORY_COST,
+                         parallelism = ARGON2_PARALLELISM)
+
+_verifyCacheSecret = os.urandom(32)
+_verifiedPasswords = TTLCache(maxSize = VERIFY_CACHE_SIZE, ttl = VERIFY_CACHE_TTL)
 
 
 def hashPassword(plainPassword: str) -> str:
-    passwordBytes = plainPassword.encode('utf-8')
-    encBytes = bcrypt.hashpw(passwordBytes, bcrypt.gensalt())
-    encPassword = encBytes.decode('utf-8')
+    return _hasher.hash(plainPassword)
+
 
-    return encPassword
+# Async variant for request handlers, so hashing doesn't block the event loop
+async def hashPasswordAsync(plainPassword: str) -> str:
+    return await asyncio.to_thread(hashPassword, plainPassword)
 
 
+# bcrypt hashes from before the switch to argon2 still verify; login
+# replaces them once needsRehash says so
 def verifyPassword(plainPassword: str, hashedPassword: str) -> bool:
-    plainBytes = plainPassword.encode('utf-8')
-    hashedBytes = hashedPassword.encode('utf-8')
+    if _isBcryptHash(hashedPassword):
+        return bcrypt.checkpw(plainPassword.encode('utf-8'), hashedPassword.encode('utf-8'))
+
+    try:
+        return _hasher.verify(hashedPassword, plainPassword)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def needsRehash(hashedPassword: str) -> bool:
+    if _isBcryptHash(hashedPassword):
+        return True
+
+    return _hasher.check_needs_rehash(hashedPassword)
+
+
+def _isBcryptHash(hashedPassword: str) -> bool:
+    return hashedPassword.startswith("$2")
+
+
+def _verifyCacheKey(plainPassword: str, hashedPassword: str) -> bytes:
+    message = hashedPassword.encode('utf-8') + b"\0" + plainPassword.encode('utf-8')
+    return hmac.new(_verifyCacheSecret, message, hashlib.sha256).digest()
+
+
+# Async variant for request handlers: bcrypt runs in a worker thread and only
+# successful checks are cached, so failed guesses always pay the full cost
+async def verifyPasswordCached(plainPassword: str, hashedPassword: str) -> bool:
+    cacheKey = _verifyCacheKey(plainPassword, hashedPassword)
+
+    if _verifiedPasswords.get(cacheKey):
+        return True
+
+    isValid = await asyncio.to_thread(verifyPassword, plainPassword, hashedPassword)
+    if isValid:
+        _verifiedPasswords.set(cacheKey, True)
 
-    return bcrypt.checkpw(plainBytes, hashedBytes)
\ No newline at end of file
+    return isValid